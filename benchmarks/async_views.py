@@ -0,0 +1,200 @@
+"""Throughput of the read-only views under WSGI, ASGI-sync and ASGI-async.
+
+Seeds a throwaway SQLite database and replays anonymous GET requests to
+the feeds and post pages from many concurrent clients, in process:
+
+* ``wsgi`` — the WSGI handler called from a pool of threads;
+* ``asgi-sync`` — the ASGI handler with the sync views (``ASYNC_VIEWS``
+  off), every request crossing into the sync thread;
+* ``asgi-async`` — the ASGI handler with ``as_async_view()``, looking
+  up cache hits and 304s in the sync thread before the view.
+
+Prints requests per second and latency percentiles of each mode. On
+Django 3.2 the built-in middleware still runs its hooks through
+``sync_to_async``, so ASGI modes pay those thread hops either way.
+
+Usage::
+
+    python benchmarks/async_views.py --clients 200 --requests 5000
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'blogicum'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+
+
+def setup_django(db_path):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.ALLOWED_HOSTS = ['*']
+    django.setup()
+
+
+def seed(n_posts):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from blog import feed
+    from blog.models import Category, Location, Post
+
+    call_command('migrate', verbosity=0)
+    User = get_user_model()
+    User.objects.bulk_create(User(username=f'user{i}') for i in range(20))
+    Category.objects.bulk_create(
+        Category(title=f'Category {i}', slug=f'category-{i}',
+                 description='', is_published=True) for i in range(5))
+    # SQLite не возвращает id из bulk_create, поэтому перечитываем.
+    users = list(User.objects.order_by('pk'))
+    categories = list(Category.objects.order_by('pk'))
+    location = Location.objects.create(name='Location')
+    now = timezone.now()
+    Post.objects.bulk_create(
+        Post(title=f'Post {i}', text='Text ' * 100,
+             pub_date=now - timedelta(hours=i), author=users[i % 20],
+             category=categories[i % 5], location=location)
+        for i in range(n_posts))
+    feed.rebuild()
+    return (
+        ['/'] * 4
+        + [f'/category/{category.slug}/' for category in categories]
+        + [f'/profile/{user.username}/' for user in users[:5]]
+        + [f'/posts/{pk}/' for pk in Post.objects.values_list(
+            'pk', flat=True)[:50]]
+    )
+
+
+def use_async_views(enabled):
+    from django.conf import settings
+    from django.urls import clear_url_caches
+
+    import blog.urls
+    import blogicum.urls
+
+    settings.ASYNC_VIEWS = enabled
+    importlib.reload(blog.urls)
+    importlib.reload(blogicum.urls)
+    clear_url_caches()
+
+
+def wsgi_environ(path):
+    return {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.url_scheme': 'http',
+        'wsgi.input': None, 'wsgi.errors': sys.stderr,
+    }
+
+
+def run_wsgi(paths, clients, total):
+    from django.core.wsgi import get_wsgi_application
+
+    from io import BytesIO
+
+    application = get_wsgi_application()
+
+    def request(path):
+        environ = wsgi_environ(path)
+        environ['wsgi.input'] = BytesIO()
+        started = time.perf_counter()
+        response = application(environ, lambda status, headers: None)
+        b''.join(response)
+        response.close()
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(clients) as pool:
+        return list(pool.map(request, paths[:total]))
+
+
+def asgi_scope(path):
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path':
+        path.encode(), 'query_string': b'', 'root_path': '', 'headers': [],
+        'client': ('127.0.0.1', 1), 'server': ('testserver', 80),
+    }
+
+
+def run_asgi(paths, clients, total):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    queue = list(reversed(paths[:total]))
+    timings = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        pass
+
+    async def client():
+        while queue:
+            path = queue.pop()
+            started = time.perf_counter()
+            await application(asgi_scope(path), receive, send)
+            timings.append(time.perf_counter() - started)
+
+    async def main():
+        await asyncio.gather(*(client() for _ in range(clients)))
+
+    asyncio.run(main())
+    return timings
+
+
+def report(name, timings, elapsed):
+    timings = sorted(timings)
+    percentiles = statistics.quantiles(timings, n=100)
+    print(f'{name:>10}: {len(timings) / elapsed:8.0f} req/s'
+          f'  p50 {percentiles[49] * 1000:7.2f} ms'
+          f'  p95 {percentiles[94] * 1000:7.2f} ms'
+          f'  p99 {percentiles[98] * 1000:7.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bench.sqlite3'))
+        urls = seed(args.posts)
+        rng = random.Random(42)
+        paths = [rng.choice(urls) for _ in range(args.requests)]
+
+        from django.core.cache import caches
+
+        modes = (
+            ('wsgi', False, run_wsgi),
+            ('asgi-sync', False, run_asgi),
+            ('asgi-async', True, run_asgi),
+        )
+        for name, async_views, run in modes:
+            for cache in caches.all():
+                cache.clear()
+            use_async_views(async_views)
+            # Прогрев: в каждом режиме страницы уже лежат в кэше.
+            run(urls, 1, len(urls))
+            started = time.perf_counter()
+            timings = run(paths, args.clients, args.requests)
+            report(name, timings, time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    main()
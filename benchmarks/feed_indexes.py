@@ -0,0 +1,151 @@
+"""Query plans and timings of the feed queries before/after feed indexes.
+
+Seeds a throwaway SQLite database, runs the listing querysets of
+``blog.views`` without the feed indexes (migration 0005) and with them
+(migration 0006), and prints ``EXPLAIN QUERY PLAN`` plus the best
+wall-clock time of each query.
+
+Usage::
+
+    python benchmarks/feed_indexes.py --posts 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'blogicum'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+
+N_USERS = 1000
+N_CATEGORIES = 20
+N_LOCATIONS = 50
+BATCH = 50000
+
+
+def setup_django(db_path):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = db_path
+    django.setup()
+
+
+def migrate(target):
+    from django.core.management import call_command
+
+    call_command('migrate', 'blog', target, verbosity=0)
+
+
+def seed(db_path, n_posts):
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    migrate('0005')
+    now = datetime.now(dt_timezone.utc)
+    stamp = now.isoformat(sep=' ')
+    rng = random.Random(42)
+    with sqlite3.connect(db_path) as db:
+        db.executemany(
+            'INSERT INTO auth_user (password, is_superuser, username,'
+            ' first_name, last_name, email, is_staff, is_active,'
+            ' date_joined) VALUES ("", 0, ?, "", "", "", 0, 1, ?)',
+            ((f'user{i}', stamp) for i in range(N_USERS)))
+        db.executemany(
+            'INSERT INTO blog_category (title, slug, description,'
+            ' is_published, created_at) VALUES (?, ?, "", ?, ?)',
+            ((f'Category {i}', f'category-{i}', i % 10 != 0, stamp)
+             for i in range(N_CATEGORIES)))
+        db.executemany(
+            'INSERT INTO blog_location (name, is_published, created_at)'
+            ' VALUES (?, 1, ?)',
+            ((f'Location {i}', stamp) for i in range(N_LOCATIONS)))
+        span = int(timedelta(days=5 * 365).total_seconds())
+        for start in range(0, n_posts, BATCH):
+            rows = []
+            for _ in range(start, min(start + BATCH, n_posts)):
+                # ~2% отложенных публикаций и ~5% снятых с публикации.
+                offset = rng.randint(-span, span // 50)
+                rows.append((
+                    'Title', 'Text ' * 40,
+                    (now + timedelta(seconds=offset)).isoformat(sep=' '),
+                    rng.random() > 0.05, stamp,
+                    rng.randint(1, N_USERS), rng.randint(1, N_CATEGORIES),
+                    rng.randint(1, N_LOCATIONS),
+                ))
+            db.executemany(
+                'INSERT INTO blog_post (title, text, pub_date, is_published,'
+                ' created_at, author_id, category_id, location_id, image,'
+                ' comment_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, "", 0)',
+                rows)
+        db.execute('ANALYZE')
+
+
+# Столбцы, которые есть уже в схеме blog 0005: более поздние миграции
+# добавили, например, updated_at, и полная выборка модели упала бы.
+SCHEMA_0005_FIELDS = (
+    'id', 'title', 'text', 'pub_date', 'is_published', 'image',
+    'comment_count', 'author__username',
+    'category__slug', 'category__title', 'category__is_published',
+    'location__name', 'location__is_published',
+)
+
+
+def feed_querysets():
+    from blog.views import get_posts_queryset
+
+    public = get_posts_queryset(
+        filter_param=True, order_param=True).only(*SCHEMA_0005_FIELDS)
+    return {
+        'index': public,
+        'category': public.filter(category_id=2),
+        'profile (public)': public.filter(author_id=7),
+        'profile (owner)': get_posts_queryset(
+            order_param=True).only(*SCHEMA_0005_FIELDS).filter(author_id=7),
+    }
+
+
+def report(title, repeat):
+    print(f'\n=== {title}')
+    for name, queryset in feed_querysets().items():
+        plan = queryset[:10].explain()
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset[:10])
+            best = min(best, time.perf_counter() - started)
+        print(f'--- {name}: {best * 1000:.2f} ms')
+        print(plan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.sqlite3')
+        setup_django(db_path)
+        started = time.perf_counter()
+        seed(db_path, args.posts)
+        print(f'Seeded {args.posts} posts in '
+              f'{time.perf_counter() - started:.1f} s')
+        report('without feed indexes (blog 0005)', args.repeat)
+        started = time.perf_counter()
+        migrate('0006')
+        print(f'\nBuilt feed indexes in {time.perf_counter() - started:.1f} s')
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        report('with feed indexes (blog 0006)', args.repeat)
+
+
+if __name__ == '__main__':
+    main()
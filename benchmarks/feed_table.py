@@ -0,0 +1,82 @@
+"""Feed pages read through the visibility predicate and through FeedEntry.
+
+Seeds a throwaway SQLite database like ``feed_indexes.py``, migrates it
+to the latest schema (which fills ``blog_feedentry``) and, for the index,
+category and public profile feeds, prints ``EXPLAIN QUERY PLAN`` plus
+the best wall-clock time of a page and of the page count, first with
+the predicate on ``blog_post`` and then with ``Post.objects.in_feed()``
+counted on ``blog_feedentry`` alone, as the feed views do.
+
+Usage::
+
+    python benchmarks/feed_table.py --posts 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from feed_indexes import seed, setup_django
+
+
+def querysets():
+    """``(page, count)`` querysets of every feed, as the views build them."""
+    from blog.models import FeedEntry, Post
+    from blog.visibility import visibility_now
+
+    predicate = Post.objects.for_cards().published(
+        visibility_now()).order_by('-pub_date', '-id')
+    feeds = {'index': {}, 'category': {'category_id': 2},
+             'profile': {'author_id': 7}}
+    return {
+        'predicate': {
+            name: (predicate.filter(**filters), predicate.filter(**filters))
+            for name, filters in feeds.items()
+        },
+        'feed table': {
+            name: (Post.objects.in_feed(**filters),
+                   FeedEntry.objects.filter(**filters))
+            for name, filters in feeds.items()
+        },
+    }
+
+
+def best_time(action, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.sqlite3')
+        setup_django(db_path)
+        seed(db_path, args.posts)
+        from django.core.management import call_command
+        from django.db import connection
+
+        started = time.perf_counter()
+        call_command('migrate', verbosity=0)
+        print(f'Migrated and filled the feed in '
+              f'{time.perf_counter() - started:.1f} s')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        for mode, feeds in querysets().items():
+            print(f'\n=== {mode}')
+            for name, (queryset, counted) in feeds.items():
+                page = best_time(lambda: list(queryset[:10]), args.repeat)
+                count = best_time(counted.count, args.repeat)
+                print(f'--- {name}: page {page:.2f} ms, count {count:.2f} ms')
+                print(queryset[:10].explain())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Full-text search with FTS5 against a naive ``icontains`` scan.
+
+Seeds a throwaway SQLite database with posts and comments made of
+random words and times, for the same queries, the first results page
+(count plus ten posts) of ``SearchResults`` and of ``naive_search()``.
+
+Usage::
+
+    python benchmarks/search.py --posts 20000 --comments 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'blogicum'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+
+SYLLABLES = (
+    'ба ве го да жи зо ка ле ми но пу ра со ту фе хи ца че ша ю я ги ду '
+    'ко ла мо не ри су ты'
+).split()
+
+
+def vocabulary(rng, size):
+    """Pseudo-words whose frequencies follow Zipf's law, like real text."""
+    words = sorted({
+        ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        for _ in range(size)})
+    rng.shuffle(words)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    return words, weights
+
+
+def setup_django(db_path):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = db_path
+    django.setup()
+
+
+def sentence(rng, words, length):
+    return ' '.join(rng.choices(*words, k=length))
+
+
+def seed(rng, words, n_posts, n_comments):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from blog.models import Category, Comment, Post
+
+    call_command('migrate', verbosity=0)
+    User = get_user_model()
+    User.objects.bulk_create(User(username=f'user{i}') for i in range(20))
+    Category.objects.create(title='Category', slug='category',
+                            description='', is_published=True)
+    # SQLite не возвращает id из bulk_create, поэтому перечитываем.
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    category = Category.objects.get()
+    now = timezone.now()
+    Post.objects.bulk_create(
+        (Post(title=sentence(rng, words, 4), text=sentence(rng, words, 120),
+              pub_date=now - timedelta(minutes=i),
+              author_id=rng.choice(user_ids), category=category)
+         for i in range(n_posts)), batch_size=1000)
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        (Comment(post_id=rng.choice(post_ids),
+                 author_id=rng.choice(user_ids), text=sentence(rng, words, 15))
+         for _ in range(n_comments)), batch_size=1000)
+
+
+def first_page(results):
+    from django.core.paginator import Paginator
+
+    page = Paginator(results, 10).get_page(1)
+    return page.paginator.count, list(page)
+
+
+def measure(search, queries, repeat):
+    timings = []
+    for query in queries:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            first_page(search(query))
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bench.sqlite3'))
+        rng = random.Random(42)
+        words = vocabulary(rng, 20000)
+        seed(rng, words, args.posts, args.comments)
+
+        from blog.search import SearchResults, naive_search
+        from blog.views import get_posts_queryset
+
+        # Запросы из слов средней частоты, как в реальном поиске.
+        queries = [
+            ' '.join(rng.sample(words[0][20:2000], rng.choice((1, 2))))
+            for _ in range(args.queries)]
+        modes = (
+            ('fts5', SearchResults),
+            ('icontains', naive_search),
+        )
+        for name, search in modes:
+            timings = measure(
+                lambda query: search(
+                    query, get_posts_queryset(filter_param=True)),
+                queries, args.repeat)
+            median = statistics.median(timings) * 1000
+            print(f'{name:>10}: median {median:8.2f} ms'
+                  f'  max {max(timings) * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
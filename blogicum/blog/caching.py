@@ -0,0 +1,247 @@
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from core.routers import primary_reads
+
+from .visibility import feed_cache_timeout, get_feed_epoch
+
+POST_CARD_TEMPLATE = 'includes/includes/post_card.html'
+
+
+def get_card_cache():
+    return caches[settings.POST_CARD_CACHE]
+
+
+def post_card_key(post):
+    """Cache key of the rendered card, changing whenever its content does."""
+    author = post.author.username if post.author_id else ''
+    version = f'{post.pk}:{post.get_cache_version()}:{author}'
+    return 'blog:post-card:' + hashlib.md5(version.encode()).hexdigest()
+
+
+def render_post_card(post):
+    """Return the HTML of ``post_card.html``, rendering it only on a miss."""
+    cache = get_card_cache()
+    key = post_card_key(post)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(POST_CARD_TEMPLATE, {'post': post})
+        cache.set(key, html, settings.POST_CARD_CACHE_TIMEOUT)
+    return html
+
+
+def get_page_cache():
+    return caches[settings.PAGE_CACHE]
+
+
+def get_state_cache():
+    """Cache of tag versions and feed state, never culled."""
+    return caches[settings.PAGE_STATE_CACHE]
+
+
+def _tag_key(tag):
+    return 'blog:tag:' + hashlib.md5(tag.encode()).hexdigest()
+
+
+def get_tag_versions(tags):
+    """Return the current version token of every tag, creating missing ones.
+
+    Versions are random tokens rather than counters, so a tag evicted
+    from the cache can never come back with a version some stale page
+    was stored under.
+    """
+    cache = get_state_cache()
+    keys = {_tag_key(tag): tag for tag in set(tags)}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, _new_version(), None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def _new_version():
+    # Метка времени в версии служит значением Last-Modified.
+    return f'{int(time.time())}.{uuid.uuid4().hex}'
+
+
+def invalidate_tags(tags):
+    """Mark every cached page carrying one of ``tags`` as stale."""
+    get_state_cache().set_many(
+        {_tag_key(tag): _new_version() for tag in set(tags)}, None)
+
+
+def collect_versions(base_tags, render):
+    """Render a page and return it with the versions of its tags.
+
+    Versions of ``base_tags`` are taken before rendering, so a write that
+    happens while the page is being built makes it stale right away.
+    """
+    versions = get_tag_versions(base_tags)
+    response, tags = render()
+    return response, {**get_tag_versions(tags), **versions}
+
+
+def post_cache_tags(post):
+    """Tags of everything a rendered post depends on."""
+    tags = [f'post:{post.pk}']
+    if post.author_id:
+        tags.append(f'author:{post.author.username}')
+    if post.category_id:
+        tags.append(f'category:{post.category.slug}')
+    if post.location_id:
+        tags.append(f'location:{post.location_id}')
+    return tags
+
+
+def is_page_cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+    )
+
+
+def _page_key(request, listing):
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    if listing:
+        # Лента меняется и от времени: ключ живёт до следующей публикации.
+        return f'blog:page:{url}:{get_feed_epoch()}'
+    return f'blog:page:{url}'
+
+
+def _is_fresh(entry):
+    return (
+        entry['expires'] > time.time()
+        and get_tag_versions(entry['tags']) == entry['tags']
+    )
+
+
+def _to_response(entry):
+    return HttpResponse(
+        entry['content'], status=entry['status'],
+        content_type=entry['content_type'])
+
+
+def _store(cache, key, request, response, tags, timeout):
+    if (response.status_code != 200 or response.streaming
+            or request.META.get('CSRF_COOKIE_USED')
+            or response.cookies or response.has_header('Set-Cookie')
+            or 'private' in response.get('Cache-Control', '')):
+        return
+    entry = {
+        'content': response.content,
+        'status': response.status_code,
+        'content_type': response['Content-Type'],
+        'tags': tags,
+        'expires': time.time() + timeout,
+    }
+    # Запись живёт дольше своего срока: пока одна копия перерисовывает
+    # страницу, остальные отдают устаревшую версию.
+    cache.set(key, entry, timeout + settings.PAGE_CACHE_STALE_TIMEOUT)
+
+
+def serve_cached_page(request, base_tags, render, listing=False):
+    """Serve an anonymous request from the page cache.
+
+    ``render`` returns a rendered response and the tags of the objects it
+    shows. Returns the response and the tag versions it was built from.
+    On a miss only one process renders the page, reading the primary
+    database, while the others serve the stale copy or wait for the
+    fresh one.
+    """
+    cache = get_page_cache()
+    key = _page_key(request, listing)
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(entry):
+        return _to_response(entry), entry['tags']
+
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, settings.PAGE_CACHE_LOCK_TIMEOUT):
+        if entry is not None:
+            return _to_response(entry), entry['tags']
+        deadline = time.monotonic() + settings.PAGE_CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return _to_response(entry), entry['tags']
+        return collect_versions(base_tags, render)
+
+    try:
+        # Отставшая реплика попала бы в кэш уже под новыми версиями тегов
+        # и жила бы там до PAGE_CACHE_TIMEOUT.
+        with primary_reads():
+            response, versions = collect_versions(base_tags, render)
+        timeout = settings.PAGE_CACHE_TIMEOUT
+        if listing:
+            timeout = feed_cache_timeout(timeout)
+        _store(cache, key, request, response, versions, timeout)
+    finally:
+        cache.delete(lock_key)
+    return response, versions
+
+
+def get_cached_response(request, listing=False):
+    """Return a fresh cached page (or a 304), or ``None`` to render it.
+
+    Meant for the async views, which call it through ``sync_to_async``
+    and only for requests without a session cookie: there is no user to
+    load, so a hit costs no query.
+    """
+    if not is_page_cacheable(request):
+        return None
+    entry = get_page_cache().get(_page_key(request, listing))
+    if entry is None or not _is_fresh(entry):
+        return None
+    return set_validators(
+        request, _to_response(entry), entry['tags'], listing)
+
+
+def _identity(request, listing):
+    """What else, besides its tags, a page depends on."""
+    user = request.user
+    parts = [
+        request.build_absolute_uri(),
+        str(user.pk), user.get_username(),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ]
+    if listing:
+        parts.append(str(get_feed_epoch()))
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def _validators(versions, identity):
+    etag = quote_etag(hashlib.md5(json.dumps(
+        [identity, sorted(versions.items())]).encode()).hexdigest())
+    last_modified = max(
+        (int(version.split('.', 1)[0]) for version in versions.values()),
+        default=None)
+    return etag, last_modified
+
+
+def set_validators(request, response, versions, listing=False):
+    """Add ``ETag`` and ``Last-Modified`` computed from tag versions.
+
+    A conditional GET that still matches them gets a 304 instead. The
+    validators are not stored anywhere: anonymous pages come from the
+    page cache without queries, other pages are compared once rendered.
+    """
+    if response.status_code != 200 or not versions:
+        return response
+    etag, last_modified = _validators(
+        versions, _identity(request, listing))
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    if request.method not in ('GET', 'HEAD'):
+        return response
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=response)
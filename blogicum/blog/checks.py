@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning, register
+
+SHARED_CACHE_SETTINGS = ('PAGE_CACHE', 'PAGE_STATE_CACHE')
+
+
+def private_caches():
+    """Settings of ``SHARED_CACHE_SETTINGS`` that name a LocMemCache."""
+    return [
+        name for name in SHARED_CACHE_SETTINGS
+        if isinstance(caches[getattr(settings, name)], LocMemCache)
+    ]
+
+
+@register()
+def check_page_cache(app_configs, **kwargs):
+    """Tag invalidation only reaches other processes through a shared cache."""
+    return [Warning(
+        f'{name} ("{getattr(settings, name)}") is a LocMemCache, which '
+        'every process keeps on its own: pages invalidated by one process '
+        'stay cached in the others for up to PAGE_CACHE_TIMEOUT.',
+        hint='Point it at a shared backend such as core.cache.FileCache, '
+             'DatabaseCache, Redis or Memcached.',
+        id='blog.W001',
+    ) for name in private_caches()]
@@ -0,0 +1,127 @@
+"""The materialized public feed: ``FeedEntry`` rows of visible posts.
+
+Signals keep the table in step with saved posts and categories. Posts
+scheduled for later get their row from ``publish_due()``, which feed
+views call before reading, so a post appears within one
+``FEED_TIME_GRANULARITY`` step of its ``pub_date`` without any write.
+The ``publish_scheduled`` command calls it right when posts come due,
+so caches are invalidated even if no feed is requested.
+``bulk_create`` and raw SQL bypass the signals: run ``rebuild()`` (the
+``rebuild_feed`` command) after them. Only the process that adds the
+rows sends ``post_published``, so its effects go to the shared
+``PAGE_STATE_CACHE``.
+"""
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.dispatch import Signal
+
+from .caching import get_state_cache
+from .models import FeedEntry, Post
+from .visibility import visibility_now
+
+# Отправляется, когда отложенные посты попадают в ленту: sender=Post,
+# posts — эти посты с загруженными автором и категорией.
+post_published = Signal()
+
+# Граница, до которой отложенные посты уже добавлены в ленту. В отличие
+# от состояния ленты в visibility, при сохранении постов не сбрасывается.
+PUBLISHED_UNTIL_KEY = 'blog:feed-published-until'
+BATCH_SIZE = 2000
+
+
+def _add(posts):
+    """Insert the rows of ``posts`` in batches; return how many."""
+    rows = posts.order_by('pk').values_list(
+        'pk', 'pub_date', 'category_id', 'author_id')
+    added, last = 0, 0
+    while True:
+        # Пачки по pk: список всех постов не держим в памяти.
+        batch = list(rows.filter(pk__gt=last)[:BATCH_SIZE])
+        # Параллельный процесс мог добавить те же строки раньше.
+        FeedEntry.objects.bulk_create([
+            FeedEntry(post_id=pk, pub_date=pub_date,
+                      category_id=category_id, author_id=author_id)
+            for pk, pub_date, category_id, author_id in batch
+        ], ignore_conflicts=True)
+        added += len(batch)
+        if len(batch) < BATCH_SIZE:
+            return added
+        last = batch[-1][0]
+
+
+def is_visible(post, moment):
+    return (
+        post.is_published
+        and post.pub_date <= moment
+        and post.category_id is not None
+        and post.category.is_published
+    )
+
+
+def sync_post(post, created=False):
+    """Add, move or remove the row of ``post`` after it was saved."""
+    if not created:
+        FeedEntry.objects.filter(post_id=post.pk).delete()
+    if is_visible(post, visibility_now()):
+        FeedEntry.objects.bulk_create([FeedEntry(
+            post_id=post.pk, pub_date=post.pub_date,
+            category_id=post.category_id, author_id=post.author_id,
+        )], ignore_conflicts=True)
+
+
+def sync_category(category):
+    """Show or hide the posts of ``category`` after it was (un)published."""
+    FeedEntry.objects.filter(category=category).delete()
+    if category.is_published:
+        _add(Post.objects.published(visibility_now()).filter(
+            category=category))
+
+
+def publish_due(moment=None):
+    """Add the scheduled posts that came due; return how many.
+
+    Only posts dated after the previous call are looked up, a range of
+    the ``post_feed_idx`` index, and at most once per feed time step.
+    Sends ``post_published`` with the added rows. Reads and writes go to
+    the primary database even during a GET: a lagging replica would make
+    it skip posts for good, and the router would pin the visitor to the
+    primary as a writer.
+    """
+    moment = moment or visibility_now()
+    since = get_state_cache().get(PUBLISHED_UNTIL_KEY)
+    if since is not None and since >= moment:
+        return 0
+    due = Post.objects.using(DEFAULT_DB_ALIAS).published(moment).filter(
+        feed_entry__isnull=True)
+    if since is not None:
+        due = due.filter(pub_date__gt=since)
+    # Наступивших постов немного: загружаем их вместе с тем, что нужно
+    # тегам кэша, чтобы получатели сигнала не делали запросов.
+    posts = list(due.select_related('author', 'category').only(
+        'pub_date', 'location', 'author__username', 'category__slug'))
+    FeedEntry.objects.using(DEFAULT_DB_ALIAS).bulk_create([
+        FeedEntry(post_id=post.pk, pub_date=post.pub_date,
+                  category_id=post.category_id, author_id=post.author_id)
+        for post in posts
+    ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+    get_state_cache().set(PUBLISHED_UNTIL_KEY, moment, None)
+    if posts:
+        post_published.send(sender=Post, posts=posts)
+    return len(posts)
+
+
+def next_due(moment=None):
+    """Return the ``pub_date`` of the next scheduled post, or ``None``."""
+    # Диапазон частичного индекса post_feed_idx, без сортировки.
+    return Post.objects.filter(
+        is_published=True, pub_date__gt=moment or visibility_now(),
+    ).order_by('pub_date').values_list('pub_date', flat=True).first()
+
+
+def rebuild():
+    """Refill the table from the posts visible now; return its row count."""
+    moment = visibility_now()
+    with transaction.atomic():
+        FeedEntry.objects.all().delete()
+        added = _add(Post.objects.published(moment))
+    get_state_cache().set(PUBLISHED_UNTIL_KEY, moment, None)
+    return added
@@ -0,0 +1,76 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from jobs.queue import task
+from .caching import invalidate_tags
+
+WEBP = 'WEBP'
+
+
+def variant_name(name, width, image_format=None):
+    """Name of a resized copy stored next to the original image."""
+    root, ext = os.path.splitext(name)
+    if image_format == WEBP:
+        ext = '.webp'
+    return f'{root}_w{width}{ext}'
+
+
+def _save_variant(storage, name, image, width, image_format):
+    if storage.exists(name):
+        return
+    if image.width > width:
+        height = round(image.height * width / image.width)
+        image = image.resize((width, height), Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, format=image_format,
+               quality=settings.POST_IMAGE_QUALITY)
+    storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def generate_variants(image_file):
+    """Write the resized and WebP copies of an image, skipping existing ones.
+
+    Returns the widths available for ``srcset``, the original one last.
+    Copies are never wider than the original, and the original width
+    gets only a WebP copy because the original file already serves it.
+    """
+    storage = image_file.storage
+    with storage.open(image_file.name) as source:
+        image = Image.open(source)
+        image_format = image.format or 'JPEG'
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    widths = sorted(
+        width for width in settings.POST_IMAGE_WIDTHS if width < image.width
+    ) + [image.width]
+    for width in widths:
+        if width < image.width:
+            _save_variant(storage, variant_name(image_file.name, width),
+                          image, width, image_format)
+        _save_variant(storage, variant_name(image_file.name, width, WEBP),
+                      image, width, WEBP)
+    return widths
+
+
+# Pillow держит в памяти несжатое изображение, поэтому одновременно
+# обрабатываем не больше двух.
+@task(concurrency=2)
+def process_post_image(post_id):
+    """Generate the image variants of a post and store their widths."""
+    from .models import Post
+
+    post = Post.objects.filter(pk=post_id).only('pk', 'image').first()
+    if post is None or not post.image:
+        return
+    widths = generate_variants(post.image)
+    # Ключи кэша карточки зависят от updated_at, поэтому обновляем и его.
+    Post.objects.filter(pk=post_id, image=post.image.name).update(
+        image_widths=widths, updated_at=timezone.now())
+    invalidate_tags([f'post:{post_id}'])
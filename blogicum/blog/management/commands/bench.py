@@ -0,0 +1,409 @@
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from blog import feed
+from blog.models import Category, Comment, Location, Post
+
+User = get_user_model()
+
+DEFAULT_MIX = 'feed=40,category=15,detail=25,profile=10,comment=5,login=5'
+PASSWORD = 'bench-password'
+BATCH = 1000
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS or not weight.isdigit():
+            raise CommandError(
+                f'Bad mix entry "{part}"; scenarios: {", ".join(SCENARIOS)}')
+        mix[name] = int(weight)
+    return mix
+
+
+def positive_int(value):
+    if not value.isdigit() or int(value) < 1:
+        raise CommandError(f'Expected a positive number, got "{value}".')
+    return int(value)
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    rank = max(1, round(share * len(values) + 0.5))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(timings, queries, seconds=None):
+    timings = sorted(timings)
+    if not timings:
+        return {'requests': 0}
+    summary = {
+        'requests': len(timings),
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+        'queries_per_request': round(sum(queries) / len(queries), 2),
+    }
+    if seconds is not None:
+        summary['seconds'] = round(seconds, 3)
+        summary['throughput_rps'] = round(len(timings) / seconds, 1)
+    return summary
+
+
+class Dataset:
+    """Scaled-up copy of the data in ``db.json``."""
+
+    def __init__(self, patterns_path, rng):
+        with open(patterns_path, encoding='utf-8') as source:
+            objects = json.load(source)
+        self.rng = rng
+        self.pools = {}
+        for item in objects:
+            self.pools.setdefault(item['model'], []).append(item['fields'])
+
+    def _pick(self, model, field, fallback):
+        values = [
+            fields[field] for fields in self.pools.get(model, [])
+            if fields.get(field)
+        ]
+        return self.rng.choice(values) if values else fallback
+
+    def seed(self, users, categories, posts, comments):
+        rng = self.rng
+        password = make_password(PASSWORD)
+        _bulk(User, (
+            User(username=f'bench{i}', password=password,
+                 first_name=self._pick('auth.user', 'first_name', ''))
+            for i in range(users)))
+        _bulk(Category, (
+            Category(
+                title=f'{self._pick("blog.category", "title", "Категория")}'
+                      f' {i}',
+                slug=f'bench-{i}',
+                description=self._pick('blog.category', 'description', ''),
+                is_published=rng.random() > 0.1)
+            for i in range(categories)))
+        _bulk(Location, (
+            Location(name=self._pick('blog.location', 'name', 'Место'))
+            for _ in range(max(categories, 1))))
+        # SQLite не возвращает id из bulk_create, поэтому читаем их.
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        category_ids = list(Category.objects.values_list('pk', flat=True))
+        location_ids = list(Location.objects.values_list('pk', flat=True))
+        now = timezone.now()
+        _bulk(Post, (
+            self._post(now, user_ids, category_ids, location_ids)
+            for _ in range(posts)))
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        _bulk(Comment, (
+            Comment(
+                post_id=rng.choice(post_ids),
+                author_id=rng.choice(user_ids),
+                text=self._pick('blog.post', 'title', 'Комментарий'))
+            for _ in range(comments)))
+        Post.objects.rebuild_comment_counts()
+        feed.rebuild()
+
+    def _post(self, now, user_ids, category_ids, location_ids):
+        rng = self.rng
+        post = Post(
+            title=self._pick('blog.post', 'title', 'Пост')[:200],
+            text=self._pick('blog.post', 'text', 'Текст'),
+            # ~2% отложенных публикаций и ~5% снятых с публикации.
+            pub_date=now + timedelta(minutes=rng.randint(-525600, 10000)),
+            is_published=rng.random() > 0.05,
+            author_id=rng.choice(user_ids),
+            category_id=rng.choice(category_ids),
+            location_id=rng.choice(location_ids + [None]))
+        post.set_excerpt()
+        return post
+
+
+def _bulk(model, objects):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == BATCH:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+class Traffic:
+    """Request generators of every scenario of the mix."""
+
+    def __init__(self, rng, auth_share):
+        self.rng = rng
+        self.auth_share = auth_share
+        visible = Post.objects.filter(
+            is_published=True, category__is_published=True,
+            pub_date__lte=timezone.now())
+        self.post_ids = list(visible.values_list('pk', flat=True))
+        self.feed_pages = max(
+            1, -(-len(self.post_ids) // settings.PAGIN_SIZE))
+        self.slugs = list(Category.objects.filter(
+            is_published=True).values_list('slug', flat=True))
+        self.usernames = list(User.objects.values_list(
+            'username', flat=True))
+        self.anonymous = Client(raise_request_exception=False)
+        self.members = []
+        for username in rng.sample(self.usernames,
+                                   min(5, len(self.usernames))):
+            client = Client(raise_request_exception=False)
+            client.force_login(User.objects.get(username=username))
+            self.members.append(client)
+
+    def reader(self):
+        if self.members and self.rng.random() < self.auth_share:
+            return self.rng.choice(self.members)
+        return self.anonymous
+
+    def feed(self):
+        # Первые страницы ленты открывают чаще глубоких.
+        page = min(self.rng.choice([1, 1, 1, 2, 3, 5]), self.feed_pages)
+        return self.reader().get(f'/?page={page}')
+
+    def category(self):
+        return self.reader().get(f'/category/{self.rng.choice(self.slugs)}/')
+
+    def detail(self):
+        return self.reader().get(f'/posts/{self.rng.choice(self.post_ids)}/')
+
+    def profile(self):
+        return self.reader().get(
+            f'/profile/{self.rng.choice(self.usernames)}/')
+
+    def comment(self):
+        return self.rng.choice(self.members).post(
+            f'/posts/{self.rng.choice(self.post_ids)}/comment/',
+            {'text': 'Комментарий из нагрузочного теста'})
+
+    def login(self):
+        return Client(raise_request_exception=False).post('/auth/login/', {
+            'username': self.rng.choice(self.usernames),
+            'password': PASSWORD,
+        })
+
+
+SCENARIOS = ('feed', 'category', 'detail', 'profile', 'comment', 'login')
+
+
+class Command(BaseCommand):
+    help = ('Seed a scaled-up dataset from db.json, replay a traffic mix '
+            'through the test client and write latency, throughput and '
+            'queries per request as JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--requests', type=positive_int, default=2000)
+        parser.add_argument('--warmup', type=int, default=100,
+                            help='Requests replayed before measuring.')
+        parser.add_argument(
+            '--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+            help=f'Scenario weights, default "{DEFAULT_MIX}".')
+        parser.add_argument(
+            '--auth-share', type=float, default=0.2,
+            help='Share of read requests made by logged-in users.')
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Threads replaying the mix at once, each with its own '
+                 'database connection. Needs a file database.')
+        parser.add_argument(
+            '--sqlite-profile', choices=('tuned', 'stock'), default='tuned',
+            help='"stock" skips SQLITE_PRAGMAS and persistent connections '
+                 'to compare with the tuned settings.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--patterns', default=str(settings.BASE_DIR.parent / 'db.json'),
+            help='Fixture the generated content is sampled from.')
+        parser.add_argument('--output', default='bench.json')
+        parser.add_argument(
+            '--use-current-database', action='store_true',
+            help='Seed the configured database instead of a temporary '
+                 'SQLite file.')
+
+    def handle(self, *args, **options):
+        with ExitStack() as stack:
+            if options['sqlite_profile'] == 'stock':
+                stack.enter_context(self.stock_sqlite())
+            if not options['use_current_database']:
+                stack.enter_context(self.temporary_database())
+            # Проверки SQL и логирование мешали бы замерам.
+            stack.enter_context(override_settings(
+                QUERY_BUDGET_MODE='off', ALLOWED_HOSTS=['*']))
+            report = self.run(options)
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        total = report['total']
+        self.stdout.write(self.style.SUCCESS(
+            f'{total["requests"]} requests, {total["throughput_rps"]} req/s,'
+            f' p50 {total["p50_ms"]} ms, p95 {total["p95_ms"]} ms,'
+            f' p99 {total["p99_ms"]} ms; written to {options["output"]}'))
+
+    def temporary_database(self):
+        directory = tempfile.TemporaryDirectory()
+        stack = ExitStack()
+        stack.enter_context(directory)
+        original = connection.settings_dict['NAME']
+        connection.close()
+        connection.settings_dict['NAME'] = os.path.join(
+            directory.name, 'bench.sqlite3')
+
+        def restore():
+            connection.close()
+            connection.settings_dict['NAME'] = original
+
+        stack.callback(restore)
+        call_command('migrate', verbosity=0)
+        return stack
+
+    def stock_sqlite(self):
+        """Plain SQLite: default PRAGMAs and a connection per request."""
+        stack = ExitStack()
+        original = connection.settings_dict['CONN_MAX_AGE']
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = 0
+
+        def restore():
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = original
+
+        stack.callback(restore)
+        stack.enter_context(override_settings(SQLITE_PRAGMAS={}))
+        return stack
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        Dataset(options['patterns'], rng).seed(
+            options['users'], options['categories'], options['posts'],
+            options['comments'])
+        seeded_in = time.perf_counter() - started
+        for cache in caches.all():
+            cache.clear()
+
+        traffic = Traffic(rng, options['auth_share'])
+        names = list(options['mix'])
+        weights = [options['mix'][name] for name in names]
+        for name in rng.choices(names, weights, k=options['warmup']):
+            getattr(traffic, name)()
+
+        plan = rng.choices(names, weights, k=options['requests'])
+        concurrency = max(1, options['concurrency'])
+        # Клиенты потоков входят в систему заранее, вне замера.
+        workers = [traffic] if concurrency == 1 else [
+            Traffic(random.Random(options['seed'] + i), options['auth_share'])
+            for i in range(concurrency)]
+        started = time.perf_counter()
+        if concurrency == 1:
+            records = replay(traffic, plan)
+        else:
+            with ThreadPoolExecutor(concurrency) as pool:
+                chunks = pool.map(
+                    replay_in_thread, workers,
+                    [plan[i::concurrency] for i in range(concurrency)])
+                records = [record for chunk in chunks for record in chunk]
+        elapsed = time.perf_counter() - started
+
+        results = {name: ([], []) for name in names}
+        statuses = {}
+        for name, seconds, queries, status in records:
+            results[name][0].append(seconds)
+            results[name][1].append(queries)
+            key = f'{name} {status}'
+            statuses[key] = statuses.get(key, 0) + 1
+        timings = [t for name in names for t in results[name][0]]
+        queries = [q for name in names for q in results[name][1]]
+        return {
+            'meta': {
+                'commit': _git_commit(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'seed': options['seed'],
+                'dataset': {
+                    'users': options['users'],
+                    'categories': options['categories'],
+                    'posts': options['posts'],
+                    'comments': options['comments'],
+                    'seconds': round(seeded_in, 1),
+                },
+                'mix': options['mix'],
+                'auth_share': options['auth_share'],
+                'concurrency': concurrency,
+                'sqlite_profile': options['sqlite_profile'],
+            },
+            'total': summarize(timings, queries, elapsed),
+            'scenarios': {
+                name: summarize(*results[name])
+                for name in names if results[name][0]
+            },
+            'statuses': statuses,
+        }
+
+
+def replay(traffic, plan):
+    """Send the requests of ``plan``.
+
+    Returns ``(scenario, seconds, queries, status)`` of every request.
+    """
+    records = []
+    queries = [0]
+
+    def count(execute, sql, params, many, context):
+        queries[0] += 1
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(count))
+        for name in plan:
+            queries[0] = 0
+            started = time.perf_counter()
+            response = getattr(traffic, name)()
+            records.append((name, time.perf_counter() - started, queries[0],
+                            response.status_code))
+    return records
+
+
+def replay_in_thread(traffic, plan):
+    try:
+        return replay(traffic, plan)
+    finally:
+        # У каждого потока своё соединение с базой.
+        connections.close_all()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, cwd=settings.BASE_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,29 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blog.ndjson import SPECS, export_rows
+
+
+class Command(BaseCommand):
+    help = ('Stream users, categories, locations, posts and comments to an '
+            'NDJSON file that import_ndjson can load.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output file, "-" for stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        output = (sys.stdout if path == '-'
+                  else open(path, 'w', encoding='utf-8'))
+        try:
+            for spec in SPECS:
+                written = 0
+                for line in export_rows(spec, options['chunk_size']):
+                    output.write(line)
+                    written += 1
+                self.stderr.write(f'{spec.label}: {written} rows')
+        finally:
+            if output is not sys.stdout:
+                output.close()
@@ -0,0 +1,154 @@
+import json
+import sys
+import time
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, reset_queries, transaction
+
+from blog import feed
+from blog.caching import get_page_cache
+from blog.models import Comment, Post
+from blog.ndjson import (SPECS, SPECS_BY_LABEL, NaturalKeyResolver,
+                         build_objects, find_identical, identity,
+                         paused_indexes, preserved_timestamps, skip_existing)
+from blog.visibility import reset_feed_state
+
+
+class Command(BaseCommand):
+    help = ('Load an NDJSON file written by export_ndjson in batches. Rows '
+            'that already exist are skipped, so an import can be rerun. '
+            'Stops if a post or comment id belongs to another row, unless '
+            '--remap-ids is given.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file, "-" for stdin.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--progress', type=int, default=100000,
+            help='Report every that many lines, 0 to stay quiet.')
+        parser.add_argument(
+            '--keep-indexes', action='store_true',
+            help='Do not drop post and comment indexes during the import.')
+        parser.add_argument(
+            '--remap-ids', action='store_true',
+            help='Give posts and comments whose id is taken by another row '
+                 'a new id, keeping their comments with them.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        source = (sys.stdin if path == '-'
+                  else open(path, encoding='utf-8'))
+        self.resolver = NaturalKeyResolver()
+        self.remap_ids = options['remap_ids']
+        # Модель -> {id из выгрузки: новый id} для строк с занятым id.
+        self.moved = {}
+        self.counts = {}
+        self.started = time.perf_counter()
+        try:
+            # Счётчики и лента в той же транзакции: при ошибке не остаются
+            # строки без них.
+            with transaction.atomic():
+                with ExitStack() as stack:
+                    if not options['keep_indexes']:
+                        stack.enter_context(paused_indexes((Post, Comment)))
+                    self.load(source, options)
+                Post.objects.rebuild_comment_counts()
+                feed.rebuild()
+                self.reset_sequences()
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        if connection.vendor == 'sqlite':
+            # Статистика планировщика для пересозданных индексов.
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        # bulk_create не отправляет сигналы, сбрасываем кэш целиком.
+        reset_feed_state()
+        get_page_cache().clear()
+        self.stdout.write(self.style.SUCCESS('Imported ' + ', '.join(
+            f'{label}: {created}/{read}'
+            for label, (read, created) in self.counts.items())))
+
+    def load(self, source, options):
+        spec, batch = None, []
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                line_spec = SPECS_BY_LABEL[item['model']]
+                fields = item['fields']
+            except (ValueError, KeyError, TypeError):
+                raise CommandError(f'Line {number}: not a known model row')
+            if line_spec is not spec or len(batch) >= options['batch_size']:
+                self.flush(spec, batch)
+                spec, batch = line_spec, []
+            batch.append(fields)
+            if options['progress'] and number % options['progress'] == 0:
+                elapsed = time.perf_counter() - self.started
+                self.stderr.write(
+                    f'{number} lines, {spec.label}, '
+                    f'{number / elapsed:.0f} lines/s')
+        self.flush(spec, batch)
+
+    def flush(self, spec, rows):
+        if not rows:
+            return
+        objects = build_objects(spec, rows, self.resolver)
+        for name, model in spec.id_refs.items():
+            moved = self.moved.get(model, {})
+            for obj in objects:
+                value = getattr(obj, name)
+                setattr(obj, name, moved.get(value, value))
+        objects, taken = skip_existing(spec, objects)
+        new = self.move(spec, taken) if taken else []
+        objects += [obj for _, obj in new]
+        with preserved_timestamps(spec.model):
+            spec.model.objects.bulk_create(objects)
+        if new:
+            # SQLite не возвращает id из bulk_create: ищем строки заново.
+            pks = find_identical(spec, [obj for _, obj in new])
+            moved = self.moved.setdefault(spec.model, {})
+            for old_pk, obj in new:
+                moved[old_pk] = pks[identity(spec, obj)]
+        read, created = self.counts.get(spec.label, (0, 0))
+        self.counts[spec.label] = (read + len(rows), created + len(objects))
+        # При DEBUG журнал запросов хранил бы текст тысяч вставок.
+        reset_queries()
+
+    def reset_sequences(self):
+        """Move sequences past the ids inserted from the dump.
+
+        Needed on PostgreSQL and Oracle; SQLite takes the next id from the
+        table itself.
+        """
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [spec.model for spec in SPECS])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def move(self, spec, taken):
+        """Handle rows whose id belongs to another row of the table.
+
+        Rows imported earlier under a new id are skipped; the others get
+        a new id. Returns ``(old_pk, obj)`` of the rows to insert.
+        """
+        if not self.remap_ids:
+            raise CommandError(
+                f'{spec.label}: ids already used by other rows: '
+                f'{", ".join(str(obj.pk) for obj in taken[:10])}. Import '
+                f'into an empty database or pass --remap-ids.')
+        identical = find_identical(spec, taken)
+        moved = self.moved.setdefault(spec.model, {})
+        new = []
+        for obj in taken:
+            pk = identical.get(identity(spec, obj))
+            if pk is not None:
+                moved[obj.pk] = pk
+                continue
+            new.append((obj.pk, obj))
+            obj.pk = None
+        return new
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from blog.images import process_post_image
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Generate resized and WebP copies of post images. Existing '
+            'copies are kept, so the command can be run repeatedly.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Also revisit posts whose copies are already recorded.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(image_widths=[])
+        processed = 0
+        for post_id in posts.values_list('pk', flat=True).iterator():
+            try:
+                process_post_image(post_id)
+            except OSError as error:
+                self.stderr.write(f'Post {post_id}: {error}')
+                continue
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed images of {processed} posts.'))
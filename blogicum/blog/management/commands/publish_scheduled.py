@@ -0,0 +1,71 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections
+from django.utils import timezone
+
+from blog.checks import private_caches
+from blog.feed import next_due, publish_due
+from blog.visibility import visible_from
+
+
+class Command(BaseCommand):
+    help = ('Publish scheduled posts as they come due: add them to the '
+            'feed, send post_published and invalidate the cached pages.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Publish the posts due now and exit.')
+        parser.add_argument(
+            '--max-sleep', type=float,
+            default=settings.FEED_TIME_GRANULARITY,
+            help='Longest wait in seconds, so posts scheduled meanwhile '
+                 'for an earlier time are not missed.')
+
+    def handle(self, *args, **options):
+        # Сбросы кэша из этого процесса должны дойти до веб-процессов.
+        private = private_caches()
+        if private:
+            raise CommandError(
+                f'{private[0]} ("{getattr(settings, private[0])}") is a '
+                'LocMemCache private to this process, so web processes '
+                'would never see the pages invalidated here. Point it at a '
+                'shared backend.')
+        self.stop = threading.Event()
+        handlers = {
+            signum: signal.signal(signum, lambda *args: self.stop.set())
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        try:
+            self.run(options['once'], options['max_sleep'])
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def run(self, once, max_sleep):
+        while not self.stop.is_set():
+            try:
+                published = publish_due()
+                delay = self.seconds_to_next(max_sleep)
+            except OperationalError as error:
+                # SQLite отвечает «database is locked» под нагрузкой.
+                self.stderr.write(str(error))
+                delay = max_sleep
+            else:
+                if published:
+                    self.stdout.write(f'Published {published} posts.')
+            if once:
+                return
+            close_old_connections()
+            self.stop.wait(delay)
+
+    @staticmethod
+    def seconds_to_next(max_sleep):
+        pub_date = next_due()
+        if pub_date is None:
+            return max_sleep
+        seconds = (visible_from(pub_date) - timezone.now()).total_seconds()
+        return min(max_sleep, max(seconds, 0))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Recalculate the denormalized comment counters of all posts.'
+
+    def handle(self, *args, **options):
+        updated = Post.objects.rebuild_comment_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Comment counters fixed for {updated} posts.'))
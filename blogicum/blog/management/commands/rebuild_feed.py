@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from blog.caching import get_page_cache
+from blog.feed import rebuild
+
+
+class Command(BaseCommand):
+    help = ('Refill the materialized feed from the posts visible now, e.g. '
+            'after bulk inserts or raw SQL that bypassed the signals.')
+
+    def handle(self, *args, **options):
+        rows = rebuild()
+        get_page_cache().clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Feed rebuilt with {rows} posts.'))
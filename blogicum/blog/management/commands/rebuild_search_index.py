@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.search import is_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = ('Refill the full-text search index from all posts and comments, '
+            'e.g. after changing the tokenizer or restoring a backup.')
+
+    def handle(self, *args, **options):
+        if not is_available():
+            raise CommandError(
+                'The search index exists only on SQLite; other databases '
+                'search with icontains.')
+        rows = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Search index rebuilt with {rows} rows.'))
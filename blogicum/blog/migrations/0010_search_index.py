@@ -0,0 +1,90 @@
+from django.db import migrations
+
+# Строки постов: rowid = id * 2, строки комментариев: rowid = id * 2 + 1.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE blog_search USING fts5(
+        title, text, comment, post_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')
+    """,
+    # Совпадение в заголовке важнее совпадения в тексте или комментарии.
+    """
+    INSERT INTO blog_search (blog_search, rank)
+    VALUES ('rank', 'bm25(10.0, 2.0, 1.0, 0.0)')
+    """,
+    """
+    CREATE TRIGGER blog_search_post_ai AFTER INSERT ON blog_post BEGIN
+        INSERT INTO blog_search (rowid, title, text, comment, post_id)
+        VALUES (new.id * 2, new.title, new.text, '', new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER blog_search_post_au AFTER UPDATE OF title, text
+    ON blog_post BEGIN
+        UPDATE blog_search SET title = new.title, text = new.text
+        WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER blog_search_post_ad AFTER DELETE ON blog_post BEGIN
+        DELETE FROM blog_search WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER blog_search_comment_ai AFTER INSERT ON blog_comment BEGIN
+        INSERT INTO blog_search (rowid, title, text, comment, post_id)
+        VALUES (new.id * 2 + 1, '', '', new.text, new.post_id);
+    END
+    """,
+    """
+    CREATE TRIGGER blog_search_comment_au AFTER UPDATE OF text, post_id
+    ON blog_comment BEGIN
+        UPDATE blog_search SET comment = new.text, post_id = new.post_id
+        WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER blog_search_comment_ad AFTER DELETE ON blog_comment BEGIN
+        DELETE FROM blog_search WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    """
+    INSERT INTO blog_search (rowid, title, text, comment, post_id)
+    SELECT id * 2, title, text, '', id FROM blog_post
+    """,
+    """
+    INSERT INTO blog_search (rowid, title, text, comment, post_id)
+    SELECT id * 2 + 1, '', '', text, post_id FROM blog_comment
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS blog_search_post_ai',
+    'DROP TRIGGER IF EXISTS blog_search_post_au',
+    'DROP TRIGGER IF EXISTS blog_search_post_ad',
+    'DROP TRIGGER IF EXISTS blog_search_comment_ai',
+    'DROP TRIGGER IF EXISTS blog_search_comment_au',
+    'DROP TRIGGER IF EXISTS blog_search_comment_ad',
+    'DROP TABLE blog_search',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        # FTS5 есть только в SQLite, остальные базы ищут через icontains.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_comment_thread_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_SQL), run(DROP_SQL)),
+    ]
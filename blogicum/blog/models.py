@@ -1,10 +1,16 @@
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.text import Truncator
 from django.contrib.auth import get_user_model
 
 from core.models import BaseModel
+from .images import WEBP, variant_name
 
 User = get_user_model()
 MAX_LENGTH = 256
+EXCERPT_WORDS = 10
 
 
 class Location(BaseModel):
@@ -42,6 +48,75 @@ class Category(BaseModel):
         return self.title
 
 
+# Столбцы, которые читает карточка поста в лентах (post_card.html,
+# ключ её кэша и теги страницы). Шаблон, обратившийся к другому полю,
+# добавил бы по запросу на каждый пост — это ловит test_feed_projection.
+CARD_FIELDS = (
+    'id', 'title', 'excerpt', 'pub_date', 'is_published', 'updated_at',
+    'image', 'image_widths', 'comment_count',
+    'author__username',
+    'category__slug', 'category__title', 'category__is_published',
+    'category__updated_at',
+    'location__name', 'location__is_published', 'location__updated_at',
+)
+
+
+# Порядок лент, читающих FeedEntry; последним идёт уникальное поле.
+FEED_ORDERING = ('-feed_entry__pub_date', '-feed_entry__post_id')
+
+
+class PostQuerySet(models.QuerySet):
+
+    def for_cards(self):
+        """Load only the columns rendered by post cards."""
+        return self.select_related(
+            'author', 'category', 'location').only(*CARD_FIELDS)
+
+    def published(self, moment):
+        """Posts visible to everyone at ``moment``."""
+        return self.filter(
+            pub_date__lte=moment,
+            is_published=True,
+            category__is_published=True)
+
+    def in_feed(self, **filters):
+        """Cards of the visible posts, read through ``FeedEntry``.
+
+        ``filters`` apply to the feed rows (``category``, ``author``), so
+        filtering and ordering are a range scan of one feed index.
+        """
+        return self.filter(
+            feed_entry__isnull=False,
+            **{f'feed_entry__{name}': value
+               for name, value in filters.items()},
+        ).select_related(
+            'author', 'category', 'location', 'feed_entry',
+        ).only(*CARD_FIELDS, 'feed_entry__pub_date').order_by(*FEED_ORDERING)
+
+    def change_comment_count(self, delta):
+        """Shift the stored comment counter without a read-modify-write."""
+        return self.update(
+            comment_count=F('comment_count') + delta,
+            updated_at=timezone.now())
+
+    def touch(self):
+        """Mark posts as changed, e.g. after one of their comments changed."""
+        return self.update(updated_at=timezone.now())
+
+    def rebuild_comment_counts(self):
+        """Recalculate ``comment_count`` in a single UPDATE statement.
+
+        Only posts whose counter was wrong are updated, and they get a new
+        ``updated_at`` so that cached cards show the fixed count.
+        """
+        counts = Comment.objects.filter(
+            post=OuterRef('pk')).order_by().values('post').annotate(
+            total=Count('pk')).values('total')
+        total = Coalesce(Subquery(counts), 0)
+        return self.exclude(comment_count=total).update(
+            comment_count=total, updated_at=timezone.now())
+
+
 class Post(BaseModel):
     id = models.AutoField(primary_key=True)
     title = models.CharField(
@@ -68,11 +143,88 @@ class Post(BaseModel):
         null=True)
     image = models.ImageField('Фото', upload_to='posts_images',
                               blank=True)
+    image_widths = models.JSONField(
+        verbose_name='Ширины копий изображения',
+        default=list,
+        blank=True,
+        editable=False)
+    comment_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False)
+    # Лентам не нужен весь текст: карточка показывает только начало.
+    excerpt = models.TextField(
+        verbose_name='Начало текста',
+        default='',
+        editable=False)
+    word_count = models.IntegerField(
+        verbose_name='Количество слов',
+        default=0,
+        editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ['-pub_date']
+        indexes = [
+            # Лента: pub_date <= now AND is_published ORDER BY -pub_date.
+            models.Index(
+                fields=['-pub_date', '-id'],
+                condition=models.Q(is_published=True),
+                name='post_feed_idx'),
+            models.Index(
+                fields=['category', '-pub_date', '-id'],
+                condition=models.Q(is_published=True),
+                name='post_category_feed_idx'),
+            # Профиль: автор видит и снятые с публикации посты.
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx'),
+        ]
+
+    def set_excerpt(self):
+        """Fill ``excerpt`` and ``word_count`` from ``text``."""
+        self.excerpt = Truncator(self.text).words(
+            EXCERPT_WORDS, truncate=' …')
+        self.word_count = len(self.text.split())
+
+    def _srcset(self, image_format=None):
+        storage, name = self.image.storage, self.image.name
+        *variants, original = self.image_widths
+        urls = [
+            (storage.url(variant_name(name, width, image_format)), width)
+            for width in variants
+        ]
+        if image_format == WEBP:
+            urls.append((storage.url(variant_name(name, original, WEBP)),
+                         original))
+        else:
+            urls.append((self.image.url, original))
+        return ', '.join(f'{url} {width}w' for url, width in urls)
+
+    @property
+    def image_srcset(self):
+        return self._srcset() if self.image_widths else ''
+
+    @property
+    def image_webp_srcset(self):
+        return self._srcset(WEBP) if self.image_widths else ''
+
+    def get_cache_version(self):
+        """Version of the post as rendered, comments included.
+
+        Comment changes touch ``updated_at`` of their post, so the version
+        only needs the post row and the rows of its category and location
+        that feed and detail queries already join.
+        """
+        stamps = [self.updated_at]
+        if self.category_id:
+            stamps.append(self.category.updated_at)
+        if self.location_id:
+            stamps.append(self.location.updated_at)
+        return int(max(stamps).timestamp() * 1_000_000)
 
 
 class Comment(BaseModel):
@@ -90,6 +242,52 @@ class Comment(BaseModel):
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['created_at']
+        indexes = [
+            # Страница комментариев поста — диапазон этого индекса.
+            models.Index(fields=('post', 'created_at', 'id'),
+                         name='comment_thread_idx'),
+        ]
 
     def __str__(self):
         return f'Комментарий {self.author} к посту {self.post}'
+
+
+class FeedEntry(models.Model):
+    """A post visible in the public feeds right now.
+
+    Rows are added and removed by ``blog.feed`` when a post or its
+    category changes and when a scheduled post comes due, so feeds read
+    this narrow table instead of checking visibility on every post.
+    """
+
+    post = models.OneToOneField(
+        Post, on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='feed_entry',
+        verbose_name='Публикация')
+    pub_date = models.DateTimeField(verbose_name='Дата и время публикации')
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False,
+        verbose_name='Категория')
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False,
+        verbose_name='Автор публикации', null=True)
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-post'],
+                         name='feed_entry_idx'),
+            models.Index(fields=['category', '-pub_date', '-post'],
+                         name='feed_entry_category_idx'),
+            models.Index(fields=['author', '-pub_date', '-post'],
+                         name='feed_entry_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} в ленте с {self.pub_date}'
@@ -0,0 +1,240 @@
+"""Streaming NDJSON dump format of users, categories, locations, posts
+and comments.
+
+Every line is ``{"model": ..., "fields": {...}}``. Foreign keys are
+written as natural keys: users by username, categories by slug,
+locations by name. Posts and comments keep their ids, which is also how
+comments refer to their post. A row whose id is taken by a different
+row (told apart by author and creation time) is a conflict: the import
+either stops or, when asked to, gives the row a new id and points the
+comments of a moved post at it.
+"""
+import datetime
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Q
+
+from .models import Category, Comment, Location, Post
+
+User = get_user_model()
+
+TIMESTAMPS = ('is_published', 'created_at', 'updated_at')
+
+
+class Spec:
+    """How one model is written to and read from the dump."""
+
+    def __init__(self, model, fields, natural_keys=None, unique=None,
+                 identity=None, id_refs=None, prepare=None):
+        self.model = model
+        self.label = model._meta.label_lower
+        self.fields = fields
+        # Внешний ключ -> (модель, поле естественного ключа).
+        self.natural_keys = natural_keys or {}
+        # Поле, по которому уже существующие строки не вставляются.
+        self.unique = unique
+        # Поля, по которым строка с тем же unique считается той же самой;
+        # иначе значение занято другой строкой.
+        self.identity = identity
+        # Поле с id строки выгрузки -> её модель, если строка могла
+        # получить при импорте новый id.
+        self.id_refs = id_refs or {}
+        # Заполняет вычисляемые поля: bulk_create не вызывает сигналы.
+        self.prepare = prepare
+
+
+SPECS = (
+    Spec(User, (
+        'username', 'password', 'email', 'first_name', 'last_name',
+        'is_active', 'is_staff', 'is_superuser', 'date_joined',
+        'last_login'), unique='username'),
+    Spec(Category, ('slug', 'title', 'description') + TIMESTAMPS,
+         unique='slug'),
+    Spec(Location, ('name',) + TIMESTAMPS, unique='name'),
+    Spec(Post, (
+        'id', 'title', 'text', 'pub_date', 'image', 'image_widths',
+    ) + TIMESTAMPS, natural_keys={
+        'author': (User, 'username'),
+        'category': (Category, 'slug'),
+        'location': (Location, 'name'),
+    }, unique='id', identity=('author_id', 'created_at'),
+        prepare=Post.set_excerpt),
+    Spec(Comment, ('id', 'post_id', 'text') + TIMESTAMPS, natural_keys={
+        'author': (User, 'username'),
+    }, unique='id', identity=('author_id', 'created_at'),
+        id_refs={'post_id': Post}),
+)
+SPECS_BY_LABEL = {spec.label: spec for spec in SPECS}
+
+
+class Encoder(DjangoJSONEncoder):
+    """Keep the microseconds that ``DjangoJSONEncoder`` cuts off."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def export_rows(spec, chunk_size):
+    """Yield the NDJSON lines of every row of ``spec.model``."""
+    lookups = {
+        f'{name}__{key}': name
+        for name, (_, key) in spec.natural_keys.items()
+    }
+    rows = spec.model.objects.order_by('pk').values(
+        *spec.fields, *lookups).iterator(chunk_size=chunk_size)
+    for row in rows:
+        fields = {name: row[name] for name in spec.fields}
+        for lookup, name in lookups.items():
+            fields[name] = row[lookup]
+        yield json.dumps(
+            {'model': spec.label, 'fields': fields},
+            cls=Encoder, ensure_ascii=False) + '\n'
+
+
+class NaturalKeyResolver:
+    """Map natural keys to primary keys, one query per batch.
+
+    Only users, categories and locations are cached, so memory grows
+    with those small tables and not with the number of imported rows.
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def resolve(self, model, key, values):
+        cache = self._cache.setdefault((model, key), {})
+        missing = {value for value in values if value is not None} - set(
+            cache)
+        if missing:
+            # У местоположений имя не уникально: берём первое по id.
+            for pk, value in model.objects.filter(
+                    **{f'{key}__in': missing}).order_by('-pk').values_list(
+                    'pk', key):
+                cache[value] = pk
+        return cache
+
+
+@contextmanager
+def preserved_timestamps(model):
+    """Let ``bulk_create`` keep ``created_at``/``updated_at`` from the dump."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+@contextmanager
+def paused_indexes(models):
+    """Drop secondary indexes of ``models`` on SQLite and rebuild them after.
+
+    Building an index once is much cheaper than updating it on every
+    inserted row. Unique indexes stay, they reject duplicate rows.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index'"
+            " AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%%'"
+            f" AND tbl_name IN ({', '.join(['%s'] * len(tables))})",
+            tables)
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX "{name}"')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for _, sql in indexes:
+                cursor.execute(sql)
+
+
+def build_objects(spec, rows, resolver):
+    """Turn the ``fields`` of a batch of lines into unsaved instances.
+
+    Rows whose required foreign key cannot be resolved are dropped.
+    """
+    resolved = {
+        name: resolver.resolve(model, key, [row.get(name) for row in rows])
+        for name, (model, key) in spec.natural_keys.items()
+    }
+    objects = []
+    for row in rows:
+        fields = {name: row[name] for name in spec.fields if name in row}
+        for name, pks in resolved.items():
+            pk = pks.get(row.get(name))
+            if pk is None and not spec.model._meta.get_field(name).null:
+                break
+            fields[f'{name}_id'] = pk
+        else:
+            obj = spec.model(**fields)
+            if spec.prepare:
+                spec.prepare(obj)
+            objects.append(obj)
+    return objects
+
+
+def identity(spec, obj):
+    """Return the ``spec.identity`` values of ``obj`` as stored."""
+    # Поля из выгрузки ещё строки: приводим их к типам модели.
+    return tuple(
+        spec.model._meta.get_field(name).to_python(getattr(obj, name))
+        for name in spec.identity
+    )
+
+
+def skip_existing(spec, objects):
+    """Drop objects whose ``spec.unique`` value is already in the table.
+
+    Returns the objects to insert and, for a spec with ``identity``, the
+    objects whose value is taken by a row with a different identity.
+    """
+    values = {getattr(obj, spec.unique) for obj in objects}
+    existing = dict(
+        (row[0], row[1:]) for row in spec.model.objects.filter(
+            **{f'{spec.unique}__in': values}
+        ).values_list(spec.unique, *(spec.identity or ())))
+    fresh, taken = [], []
+    for obj in objects:
+        value = getattr(obj, spec.unique)
+        if value not in existing:
+            existing[value] = identity(spec, obj) if spec.identity else ()
+            fresh.append(obj)
+        elif spec.identity and existing[value] != identity(spec, obj):
+            taken.append(obj)
+    return fresh, taken
+
+
+def find_identical(spec, objects):
+    """Map the identity of each of ``objects`` to the pk of its row, if any.
+
+    Finds the rows that an earlier import gave a new id.
+    """
+    keys = {identity(spec, obj) for obj in objects}
+    rows = spec.model.objects.all()
+    for number, name in enumerate(spec.identity):
+        values = {key[number] for key in keys}
+        # Автор может быть удалён: NULL не находится через IN.
+        condition = Q(**{f'{name}__in': values - {None}})
+        if None in values:
+            condition |= Q(**{f'{name}__isnull': True})
+        rows = rows.filter(condition)
+    rows = rows.values_list('pk', *spec.identity)
+    return {tuple(row[1:]): row[0] for row in rows if tuple(row[1:]) in keys}
@@ -0,0 +1,165 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class CountedPaginator(Paginator):
+    """Paginator that takes the number of items from ``count()``.
+
+    For lists whose rows can be counted with a cheaper query than the
+    one that loads them.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        return self._count()
+
+
+class CursorPage:
+    """A page of a keyset-paginated result with opaque navigation tokens."""
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset paginator: every page is a bounded index range scan.
+
+    Unlike ``django.core.paginator.Paginator`` it never counts the rows
+    and never uses OFFSET, so the cost of a page does not depend on how
+    deep it is. ``ordering`` must end with a unique field and all its
+    fields must be sorted in the same direction; they may follow
+    relations loaded with ``select_related``.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = tuple(name.lstrip('-') for name in self.ordering)
+        self.descending = self.ordering[0].startswith('-')
+
+    def page(self, cursor=None):
+        if not cursor:
+            return self._page_after(None)
+        direction, values = self.decode_cursor(cursor)
+        if direction == 'next':
+            return self._page_after(values)
+        return self._page_before(values)
+
+    def _page_after(self, values):
+        queryset = self.object_list.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(
+                self._keyset(values, 'lt' if self.descending else 'gt'))
+        items = list(queryset[:self.per_page + 1])
+        has_next = len(items) > self.per_page
+        items = items[:self.per_page]
+        return CursorPage(
+            items, self,
+            next_cursor=self._cursor_for('next', items[-1])
+            if has_next else None,
+            previous_cursor=self._cursor_for('prev', items[0])
+            if values is not None and items else None,
+        )
+
+    def _page_before(self, values):
+        reverse_ordering = [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+        queryset = self.object_list.order_by(*reverse_ordering).filter(
+            self._keyset(values, 'gt' if self.descending else 'lt'))
+        items = list(queryset[:self.per_page + 1])
+        has_previous = len(items) > self.per_page
+        items = items[:self.per_page][::-1]
+        return CursorPage(
+            items, self,
+            next_cursor=self._cursor_for('next', items[-1])
+            if items else None,
+            previous_cursor=self._cursor_for('prev', items[0])
+            if has_previous else None,
+        )
+
+    def _keyset(self, values, lookup):
+        condition = Q()
+        for position, name in enumerate(self.fields):
+            equal = {
+                self.fields[i]: values[i] for i in range(position)
+            }
+            condition |= Q(**equal, **{f'{name}__{lookup}': values[position]})
+        return condition
+
+    def _cursor_for(self, direction, item):
+        values = []
+        for name in self.fields:
+            value = item
+            for attname in name.split('__'):
+                value = getattr(value, attname)
+            values.append(value)
+        raw = json.dumps(
+            [direction, [self._serialize(value) for value in values]])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def _serialize(value):
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    def _field(self, name):
+        model = self.object_list.model
+        *relations, attname = name.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(attname)
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, raw_values = json.loads(
+                base64.urlsafe_b64decode(padded.encode()))
+            if direction not in ('next', 'prev') or (
+                    len(raw_values) != len(self.fields)):
+                raise ValueError(cursor)
+            values = [
+                self._field(name).to_python(value)
+                for name, value in zip(self.fields, raw_values)
+            ]
+        except (binascii.Error, ValidationError, TypeError, ValueError):
+            raise InvalidPage('Неверный курсор страницы.')
+        return direction, values
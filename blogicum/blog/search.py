@@ -0,0 +1,189 @@
+"""Full-text search over post titles, texts and comments.
+
+On SQLite the FTS5 table ``blog_search`` (migration 0010) holds one row
+per post (``rowid = id * 2``) and one per comment (``rowid = id * 2 +
+1``), kept in sync by triggers, so raw SQL and ``bulk_create`` updates
+are indexed too. Other databases fall back to an ``icontains`` scan.
+
+SQLite drops the triggers of a table whenever a migration rebuilds it,
+so ``install_triggers()`` recreates them after every ``migrate``.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+SEARCH_TABLE = 'blog_search'
+SNIPPET_TOKENS = 16
+# Управляющие символы не встречаются в тексте, их заменяем на <mark>.
+_MARK_START, _MARK_END = '\x02', '\x03'
+_TERM = re.compile(r'\w+')
+
+TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_post_ai
+    AFTER INSERT ON blog_post BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, title, text, comment, post_id)
+        VALUES (new.id * 2, new.title, new.text, '', new.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_post_au
+    AFTER UPDATE OF title, text ON blog_post BEGIN
+        UPDATE {SEARCH_TABLE} SET title = new.title, text = new.text
+        WHERE rowid = old.id * 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_post_ad
+    AFTER DELETE ON blog_post BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_comment_ai
+    AFTER INSERT ON blog_comment BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, title, text, comment, post_id)
+        VALUES (new.id * 2 + 1, '', '', new.text, new.post_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_comment_au
+    AFTER UPDATE OF text, post_id ON blog_comment BEGIN
+        UPDATE {SEARCH_TABLE} SET comment = new.text, post_id = new.post_id
+        WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_comment_ad
+    AFTER DELETE ON blog_comment BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+)
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def install_triggers(using='default'):
+    """Create the sync triggers that are missing, if the index exists."""
+    db = connections[using]
+    if (db.vendor != 'sqlite'
+            or SEARCH_TABLE not in db.introspection.table_names()):
+        return
+    with db.cursor() as cursor:
+        for statement in TRIGGERS:
+            cursor.execute(statement)
+
+
+def build_match(query):
+    """Turn user input into an FTS5 query: every word, as a prefix."""
+    return ' '.join(f'"{term}"*' for term in _TERM.findall(query.lower()))
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet).replace(_MARK_START, '<mark>')
+        .replace(_MARK_END, '</mark>'))
+
+
+class SearchResults:
+    """Posts of ``visible`` matching ``query``, best match first.
+
+    Sliced by ``Paginator`` like a queryset: ``count()`` and every page
+    cost one query each, plus one for the posts and one for snippets.
+    Every post gets ``search_snippet`` with the matches in ``<mark>``.
+    """
+
+    def __init__(self, query, visible):
+        self.match = build_match(query)
+        self.visible = visible
+        sql, params = visible.values('pk').query.sql_with_params()
+        self._where = (
+            f'{SEARCH_TABLE} MATCH %s AND post_id IN ({sql})')
+        self._params = (self.match, *params)
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(DISTINCT post_id) FROM {SEARCH_TABLE}'
+                f' WHERE {self._where}', self._params)
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, page):
+        if not self.match:
+            return []
+        with connection.cursor() as cursor:
+            # Для min() SQLite берёт rowid из строки с лучшим рангом.
+            cursor.execute(
+                f'SELECT post_id, rowid, MIN(rank) AS score'
+                f' FROM {SEARCH_TABLE} WHERE {self._where}'
+                f' GROUP BY post_id ORDER BY score, post_id'
+                f' LIMIT %s OFFSET %s',
+                (*self._params, page.stop - page.start, page.start))
+            best = cursor.fetchall()
+        if not best:
+            return []
+        posts = self.visible.in_bulk([post_id for post_id, _, _ in best])
+        snippets = self._snippets([rowid for _, rowid, _ in best])
+        results = []
+        for post_id, rowid, _ in best:
+            post = posts[post_id]
+            post.search_snippet = highlight(snippets[rowid])
+            results.append(post)
+        return results
+
+    def _snippets(self, rowids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, snippet({SEARCH_TABLE}, -1, %s, %s, '…', %s)"
+                f" FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s"
+                f" AND rowid IN ({', '.join(['%s'] * len(rowids))})",
+                (_MARK_START, _MARK_END, SNIPPET_TOKENS, self.match,
+                 *rowids))
+            return dict(cursor.fetchall())
+
+
+def naive_search(query, visible):
+    """The ``icontains`` scan used where FTS5 is unavailable."""
+    terms = _TERM.findall(query)
+    if not terms:
+        return visible.none()
+    for term in terms:
+        visible = visible.filter(
+            Q(title__icontains=term) | Q(text__icontains=term)
+            | Q(comments__text__icontains=term))
+    return visible.distinct().order_by('-pub_date')
+
+
+def search_posts(query, visible):
+    if is_available():
+        return SearchResults(query, visible)
+    return naive_search(query, visible)
+
+
+def rebuild_index():
+    """Refill the FTS5 table from posts and comments; return its row count."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}"
+            f" (rowid, title, text, comment, post_id)"
+            f" SELECT id * 2, title, text, '', id FROM blog_post")
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}"
+            f" (rowid, title, text, comment, post_id)"
+            f" SELECT id * 2 + 1, '', '', text, post_id FROM blog_comment")
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
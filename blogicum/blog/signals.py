@@ -0,0 +1,221 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import feed
+from .caching import invalidate_tags, post_cache_tags
+from .images import process_post_image
+from .models import Category, Comment, Location, Post
+from .search import install_triggers
+from .visibility import reset_feed_state
+
+User = get_user_model()
+# Поля поста, от которых зависит его строка в FeedEntry.
+FEED_ATTNAMES = ('pub_date', 'is_published', 'category_id', 'author_id')
+
+
+class _DeletedPosts(threading.local):
+    """Posts whose deletion is in progress in this thread.
+
+    The ids belong to the transaction that deletes the posts: they are
+    forgotten on commit, and stop counting once that transaction (or
+    savepoint) rolls back and drops its ``on_commit`` callback.
+    """
+
+    def __init__(self):
+        self.ids = set()
+        self._forget = None
+        self._using = None
+        self._index = None
+
+    def add(self, pk, using):
+        if not self._is_current():
+            self.ids = set()
+            self._forget, self._using = self.ids.clear, using
+            self._index = len(self._callbacks())
+            transaction.on_commit(self._forget, using=using)
+        self.ids.add(pk)
+
+    def __contains__(self, pk):
+        if pk not in self.ids:
+            return False
+        if self._is_current():
+            return True
+        # Удаление откатилось: его посты остались, счётчик нужен.
+        self.ids = set()
+        return False
+
+    def _callbacks(self):
+        return transaction.get_connection(self._using).run_on_commit
+
+    def _is_current(self):
+        if self._forget is None:
+            return False
+        callbacks = self._callbacks()
+        return (len(callbacks) > self._index
+                and callbacks[self._index][1] == self._forget)
+
+
+_deleted_posts = _DeletedPosts()
+
+
+def _related_tags(category_ids=(), author_ids=()):
+    tags = [
+        f'category:{slug}' for slug in Category.objects.filter(
+            pk__in=[pk for pk in category_ids if pk]
+        ).values_list('slug', flat=True)
+    ]
+    tags += [
+        f'author:{username}' for username in User.objects.filter(
+            pk__in=[pk for pk in author_ids if pk]
+        ).values_list('username', flat=True)
+    ]
+    return tags
+
+
+@receiver(post_save, sender=Comment)
+def update_count_on_comment_save(sender, instance, created, **kwargs):
+    old_post_id = instance.get_loaded_value('post_id')
+    if created:
+        Post.objects.filter(pk=instance.post_id).change_comment_count(1)
+    elif old_post_id is not None and old_post_id != instance.post_id:
+        Post.objects.filter(pk=old_post_id).change_comment_count(-1)
+        Post.objects.filter(pk=instance.post_id).change_comment_count(1)
+        invalidate_tags([f'post:{old_post_id}'])
+    else:
+        Post.objects.filter(pk=instance.post_id).touch()
+    invalidate_tags([f'post:{instance.post_id}'])
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post(sender, instance, **kwargs):
+    _deleted_posts.add(instance.pk, kwargs['using'])
+
+
+@receiver(post_delete, sender=Comment)
+def update_count_on_comment_delete(sender, instance, **kwargs):
+    if instance.post_id in _deleted_posts:
+        # Комментарии удаляются вместе с постом: счётчик не нужен.
+        return
+    Post.objects.filter(pk=instance.post_id).change_comment_count(-1)
+    invalidate_tags([f'post:{instance.post_id}'])
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_post(sender, instance, **kwargs):
+    # Комментарии поста удаляются раньше самого поста.
+    _deleted_posts.ids.discard(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def refresh_post_caches(sender, instance, **kwargs):
+    reset_feed_state()
+    invalidate_tags(['feed', f'post:{instance.pk}'] + _related_tags(
+        category_ids={
+            instance.category_id,
+            instance.get_loaded_value('category_id')},
+        author_ids={
+            instance.author_id,
+            instance.get_loaded_value('author_id')},
+    ))
+
+
+@receiver(post_save, sender=Post)
+def update_feed_entry(sender, instance, created, **kwargs):
+    if created or any(
+            instance.get_loaded_value(attname) != getattr(instance, attname)
+            for attname in FEED_ATTNAMES):
+        feed.sync_post(instance, created)
+
+
+@receiver(feed.post_published)
+def invalidate_published_pages(sender, posts, **kwargs):
+    # Одна пачка тегов на все посты, наступившие к этому шагу ленты.
+    # Состояние ленты не сбрасываем: get_feed_state() сам пересчитывает
+    # его, когда наступает next_due, а лишний сброс повторял бы запрос.
+    tags = {'feed'}
+    for post in posts:
+        tags.update(post_cache_tags(post))
+    invalidate_tags(tags)
+
+
+@receiver(pre_save, sender=Post)
+def reset_image_widths(sender, instance, **kwargs):
+    if instance.image.name != instance.get_loaded_value('image'):
+        instance.image_widths = []
+
+
+@receiver(pre_save, sender=Post)
+def update_excerpt(sender, instance, **kwargs):
+    # Отложенный text не загружаем: без него он и не менялся.
+    if 'text' in instance.__dict__:
+        instance.set_excerpt()
+
+
+@receiver(post_save, sender=Post)
+def process_new_image(sender, instance, **kwargs):
+    if instance.image and not instance.image_widths:
+        process_post_image.enqueue(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    posts = Post.objects.filter(category=instance)
+    tags = [f'category:{instance.slug}']
+    old_slug = instance.get_loaded_value('slug')
+    if old_slug:
+        tags.append(f'category:{old_slug}')
+    if instance.get_loaded_value('is_published') != instance.is_published:
+        # Посты категории появляются в лентах или пропадают из них.
+        tags.append('feed')
+        tags += _related_tags(author_ids=set(
+            posts.values_list('author_id', flat=True).distinct()))
+    invalidate_tags(tags)
+
+
+@receiver(post_save, sender=Category)
+def update_category_feed(sender, instance, created, **kwargs):
+    if (not created and instance.get_loaded_value('is_published')
+            != instance.is_published):
+        feed.sync_category(instance)
+
+
+@receiver(post_save, sender=Location)
+@receiver(pre_delete, sender=Location)
+def invalidate_location_pages(sender, instance, **kwargs):
+    invalidate_tags([f'location:{instance.pk}'])
+
+
+def _is_login_update(update_fields):
+    return update_fields == frozenset({'last_login'})
+
+
+@receiver(pre_save, sender=User)
+def remember_old_username(sender, instance, update_fields, **kwargs):
+    if instance.pk and not _is_login_update(update_fields):
+        instance._old_username = User.objects.filter(
+            pk=instance.pk).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_pages(sender, instance, created, update_fields,
+                            **kwargs):
+    if created or _is_login_update(update_fields):
+        return
+    invalidate_tags({
+        f'author:{instance.username}',
+        f'author:{getattr(instance, "_old_username", instance.username)}',
+    })
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'blog':
+        install_triggers(using)
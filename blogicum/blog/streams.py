@@ -0,0 +1,165 @@
+"""Server-Sent Events stream of new comments, served as a raw ASGI app.
+
+Django 3.2 iterates streaming responses synchronously, so an open stream
+would hold a worker thread. The stream is therefore answered before
+Django by ``blogicum.asgi`` and waits on an asyncio queue: an idle
+connection costs a coroutine, not a thread. Subscribers live in the
+memory of the process, so comments reach readers connected to the same
+server process.
+"""
+import asyncio
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from .models import Comment, Post
+from .visibility import visibility_now
+
+STREAM_PATH = re.compile(r'^/posts/(?P<post_id>\d+)/comments/stream/$')
+COMMENT_TEMPLATE = 'includes/includes/comment_item.html'
+
+
+class CommentBroker:
+    """In-process pub/sub of rendered comments, keyed by post id."""
+
+    def __init__(self):
+        self._subscribers = {}
+
+    def subscribe(self, post_id):
+        queue = asyncio.Queue(settings.COMMENT_STREAM_QUEUE_SIZE)
+        self._subscribers.setdefault(post_id, {})[queue] = (
+            asyncio.get_running_loop())
+        return queue
+
+    def has_subscribers(self, post_id):
+        return bool(self._subscribers.get(post_id))
+
+    def unsubscribe(self, post_id, queue):
+        subscribers = self._subscribers.get(post_id, {})
+        subscribers.pop(queue, None)
+        if not subscribers:
+            self._subscribers.pop(post_id, None)
+
+    def publish(self, post_id, event_id, html):
+        """Hand an event to every subscriber; safe to call from any thread."""
+        for queue, loop in list(self._subscribers.get(post_id, {}).items()):
+            loop.call_soon_threadsafe(_offer, queue, (event_id, html))
+
+
+def _offer(queue, event):
+    # Медленный читатель теряет события, а не копит их в памяти.
+    if not queue.full():
+        queue.put_nowait(event)
+
+
+broker = CommentBroker()
+
+
+def render_comment(comment):
+    return render_to_string(
+        COMMENT_TEMPLATE, {'comment': comment, 'post': comment.post})
+
+
+def publish_comment(comment):
+    """Push a new comment to the readers of its post."""
+    if not broker.has_subscribers(comment.post_id):
+        return
+    broker.publish(comment.post_id, comment.pk, render_comment(comment))
+
+
+def _is_public(post_id):
+    return Post.objects.filter(
+        pk=post_id,
+        pub_date__lte=visibility_now(),
+        is_published=True,
+        category__is_published=True,
+    ).exists()
+
+
+def _missed_comments(post_id, last_event_id):
+    comments = Comment.objects.filter(
+        post_id=post_id, pk__gt=last_event_id
+    ).select_related('author', 'post').order_by('pk')
+    return [
+        (comment.pk, render_comment(comment))
+        for comment in comments[:settings.COMMENT_STREAM_QUEUE_SIZE]
+    ]
+
+
+def _event(event_id, html):
+    lines = ''.join(f'data: {line}\n' for line in html.splitlines())
+    return f'id: {event_id}\nevent: comment\n{lines}\n'.encode()
+
+
+def _last_event_id(scope):
+    for name, value in scope['headers']:
+        if name == b'last-event-id' and value.isdigit():
+            return int(value)
+    return None
+
+
+async def _send_status(send, status):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _start_stream(scope, send, post_id):
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    # Переподключившийся клиент получает пропущенные комментарии.
+    last_event_id = _last_event_id(scope)
+    if last_event_id is not None:
+        for missed in await sync_to_async(_missed_comments)(
+                post_id, last_event_id):
+            await send({'type': 'http.response.body',
+                        'body': _event(*missed), 'more_body': True})
+
+
+async def comment_stream(scope, receive, send, post_id):
+    """ASGI app streaming the new comments of a published post."""
+    if scope['method'] not in ('GET', 'HEAD'):
+        return await _send_status(send, 405)
+    if not await sync_to_async(_is_public)(post_id):
+        return await _send_status(send, 404)
+
+    queue = broker.subscribe(post_id)
+    disconnect = asyncio.ensure_future(receive())
+    event = None
+    try:
+        await _start_stream(scope, send, post_id)
+        while True:
+            if event is None:
+                event = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {event, disconnect},
+                timeout=settings.COMMENT_STREAM_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                if disconnect.result()['type'] == 'http.disconnect':
+                    return
+                disconnect = asyncio.ensure_future(receive())
+            if event in done:
+                body = _event(*event.result())
+                event = None
+            elif not done:
+                # Комментарий SSE не даёт прокси закрыть тихое соединение.
+                body = b': keep-alive\n\n'
+            else:
+                continue
+            await send({'type': 'http.response.body', 'body': body,
+                        'more_body': True})
+    finally:
+        if event is not None:
+            event.cancel()
+        disconnect.cancel()
+        broker.unsubscribe(post_id, queue)
@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from blog.caching import render_post_card
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post):
+    """Render a feed card of the post from the fragment cache."""
+    return mark_safe(render_post_card(post))
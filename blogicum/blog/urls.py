@@ -1,17 +1,31 @@
+from django.conf import settings
 from django.urls import path
 from django.urls.conf import include
 
 from .views import (
     CreatePostView, EditPostView,
     DeletePostView, PostDetailView,
-    IndexView, CategoryView, CreateCommentView,
-    EditCommentView, DeleteCommentView, ProfileView, ProfileEditView)
+    IndexView, CategoryView, CreateCommentView, PostCommentsView,
+    EditCommentView, DeleteCommentView, ProfileView, ProfileEditView,
+    SearchView,
+    as_async_view, comment_stream_unavailable)
 
 app_name = 'blog'
 
+
+def read_view(view_class):
+    if settings.ASYNC_VIEWS:
+        return as_async_view(view_class)
+    return view_class.as_view()
+
+
 post_urls = [
-    path('<int:post_id>/', PostDetailView.as_view(),
+    path('<int:post_id>/', read_view(PostDetailView),
          name='post_detail'),
+    path('<int:post_id>/comments/', read_view(PostCommentsView),
+         name='post_comments'),
+    path('<int:post_id>/comments/stream/', comment_stream_unavailable,
+         name='post_comments_stream'),
     path('create/', CreatePostView.as_view(),
          name='create_post'),
     path('<int:post_id>/edit/', EditPostView.as_view(),
@@ -27,12 +41,13 @@ post_urls = [
 ]
 
 urlpatterns = [
-    path('', IndexView.as_view(), name='index'),
+    path('', read_view(IndexView), name='index'),
     path('posts/', include(post_urls)),
-    path('category/<slug:category_slug>/', CategoryView.as_view(),
+    path('category/<slug:category_slug>/', read_view(CategoryView),
          name='category_posts'),
+    path('search/', SearchView.as_view(), name='search'),
     path('profile/edit/', ProfileEditView.as_view(),
          name="edit_profile"),
-    path('profile/<str:username>/', ProfileView.as_view(),
+    path('profile/<str:username>/', read_view(ProfileView),
          name='profile'),
 ]
@@ -1,44 +1,173 @@
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.mixins import (
     LoginRequiredMixin, UserPassesTestMixin
 )
-from django.db.models import Count
+from django.core.paginator import InvalidPage
+from django.db import transaction
 from django.utils import timezone
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy, reverse
 from django.contrib.auth.models import User
 from django.conf import settings
 
+from .caching import (
+    collect_versions, get_cached_response, is_page_cacheable,
+    post_cache_tags, serve_cached_page, set_validators
+)
+from .feed import publish_due
 from .forms import PostForm, CommentForm
-from .models import Post, Category, Comment
+from .models import FEED_ORDERING, FeedEntry, Post, Category, Comment
+from .paginators import CountedPaginator, CursorPaginator
+from .search import search_posts
+from .streams import publish_comment
+from .visibility import visibility_now
 from django.views.generic import (
     CreateView, DetailView, ListView, UpdateView, DeleteView
 )
 
 
-class ProfileView(ListView):
+class FeedPaginationMixin:
+    """Mixin for post lists that can switch to keyset pagination.
+
+    Lists of visible posts are read from the materialized feed: its rows
+    are filtered by ``get_feed_filters()`` and counted without the posts.
+    """
+
+    paginate_by = settings.PAGIN_SIZE
+    cursor_ordering = ('-pub_date', '-id')
+
+    def get_feed_filters(self):
+        """``FeedEntry`` filters of the list, ``None`` if it is no feed."""
+        return {}
+
+    def get_queryset(self):
+        return get_feed_queryset(**self.get_feed_filters())
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        filters = self.get_feed_filters()
+        if filters is None:
+            return super().get_paginator(queryset, per_page, **kwargs)
+        return CountedPaginator(
+            queryset, per_page,
+            count=FeedEntry.objects.filter(**filters).count, **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not settings.CURSOR_PAGINATION:
+            return super().paginate_queryset(queryset, page_size)
+        ordering = self.cursor_ordering
+        if self.get_feed_filters() is not None:
+            ordering = FEED_ORDERING
+        paginator = CursorPaginator(queryset, page_size, ordering)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidPage as error:
+            raise Http404(str(error))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class PageCacheMixin:
+    """Mixin that serves anonymous GET requests from the page cache.
+
+    Every response also gets ``ETag``/``Last-Modified`` validators built
+    from the versions of its tags, and conditional requests that still
+    match them are answered with 304. For anonymous visitors that happens
+    from the page cache, before the view runs any query.
+    """
+
+    listing = True
+
+    def get_base_cache_tags(self):
+        """Tags known from the URL alone, before any query runs."""
+        return ['feed']
+
+    def get_cache_tags(self, context):
+        """Tags of the objects shown on the rendered page."""
+        tags = []
+        for post in context['page_obj']:
+            tags += post_cache_tags(post)
+        return tags
+
+    def dispatch(self, request, *args, **kwargs):
+        def render():
+            response = super(PageCacheMixin, self).dispatch(
+                request, *args, **kwargs)
+            if not hasattr(response, 'render'):
+                return response, []
+            response.render()
+            return response, self.get_cache_tags(response.context_data)
+
+        if is_page_cacheable(request):
+            response, versions = serve_cached_page(
+                request, self.get_base_cache_tags(), render, self.listing)
+        else:
+            response, versions = collect_versions(
+                self.get_base_cache_tags(), render)
+        return set_validators(request, response, versions, self.listing)
+
+
+def as_async_view(view_class, **initkwargs):
+    """Return an async view for the read-only pages under ASGI.
+
+    The page cache is files on disk and Django 3.2 has no async ORM, so
+    nothing runs on the event loop: fresh pages from the page cache, or
+    304 responses to them, for visitors without a session are looked up
+    in the sync thread, skipping the view itself, and everything else is
+    rendered by the sync view. The lookup may query the database when
+    the feed state is due, so it is not moved to a worker thread.
+    """
+    sync_view = view_class.as_view(**initkwargs)
+    render = sync_to_async(sync_view)
+    lookup = sync_to_async(get_cached_response)
+
+    async def view(request, *args, **kwargs):
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            response = await lookup(request, view_class.listing)
+            if response is not None:
+                return response
+        return await render(request, *args, **kwargs)
+
+    update_wrapper(view, sync_view)
+    return view
+
+
+class ProfileView(PageCacheMixin, FeedPaginationMixin, ListView):
     """View to display a user's profile with their posts."""
 
     # model = Post
     template_name = 'blog/profile.html'
     # context_object_name = 'post_list'
-    paginate_by = settings.PAGIN_SIZE
 
     def get_user_object(self):
-        return get_object_or_404(User, username=self.kwargs['username'])
+        if not hasattr(self, 'profile_user'):
+            self.profile_user = get_object_or_404(
+                User, username=self.kwargs['username'])
+        return self.profile_user
 
-    def get_queryset(self):
+    def get_feed_filters(self):
         profile_user = self.get_user_object()
-        queryset = get_posts_queryset(
-            filter_param=self.request.user != profile_user,
-            annotate_param=True).filter(author=profile_user)
-        return queryset
+        if self.request.user == profile_user:
+            # Автор видит и отложенные, и снятые с публикации посты.
+            return None
+        return {'author': profile_user}
+
+    def get_queryset(self):
+        if self.get_feed_filters() is not None:
+            return super().get_queryset()
+        return get_posts_queryset(
+            order_param=True, listing=True).filter(
+            author=self.get_user_object())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['profile'] = self.get_user_object()
         return context
 
+    def get_base_cache_tags(self):
+        return [f'author:{self.kwargs["username"]}']
+
 
 class ProfileEditView(LoginRequiredMixin, UpdateView):
     """View to edit the profile of the logged-in user."""
@@ -55,48 +184,74 @@ class ProfileEditView(LoginRequiredMixin, UpdateView):
                             kwargs={'username': self.request.user.username})
 
 
-def get_posts_queryset(filter_param=False, annotate_param=False):
+def get_posts_queryset(filter_param=False, order_param=False,
+                       listing=False):
     queryset = Post.objects.select_related(
         'author', 'category', 'location')
+    if listing:
+        # Только столбцы карточки: без текста поста, пароля автора и
+        # описания категории.
+        queryset = queryset.for_cards()
     if filter_param:
-        queryset = queryset.filter(
-            pub_date__lte=timezone.now(),
-            is_published=True,
-            category__is_published=True
-        )
-    if annotate_param:
-        queryset = queryset.annotate(
-            comment_count=Count('comments')).order_by('-pub_date')
+        queryset = queryset.published(visibility_now())
+    if order_param:
+        queryset = queryset.order_by('-pub_date')
     return queryset
 
 
-class IndexView(ListView):
+def get_feed_queryset(**filters):
+    """Cards of the visible posts from the materialized feed."""
+    publish_due()
+    return Post.objects.in_feed(**filters)
+
+
+class IndexView(PageCacheMixin, FeedPaginationMixin, ListView):
     """View to display the index page with a list of posts."""
 
     # model = Post
     template_name = 'blog/index.html'
     # context_object_name = 'post_list'
-    paginate_by = settings.PAGIN_SIZE
-    queryset = get_posts_queryset(filter_param=True, annotate_param=True)
 
 
-class PostDetailView(DetailView):
+def get_comments_page(post, cursor=None):
+    """Return a page of the post's comments, oldest first."""
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_PAGE_SIZE, ordering=('created_at', 'id'))
+    try:
+        return paginator.page(cursor)
+    except InvalidPage as error:
+        raise Http404(str(error))
+
+
+class PostDetailView(PageCacheMixin, DetailView):
     """View to display the details of a single post."""
 
+    listing = False
+
     # model = Post
     template_name = 'blog/detail.html'
     # context_object_name = 'post'
     pk_url_kwarg = 'post_id'
     queryset = get_posts_queryset(filter_param=False,
-                                  annotate_param=False)
+                                  order_param=False)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form'] = CommentForm()
-        context['comments'] = self.object.comments.select_related(
-            'author')
+        context['comments'] = get_comments_page(
+            self.object, self.request.GET.get('comments'))
         return context
 
+    def get_base_cache_tags(self):
+        return [f'post:{self.kwargs["post_id"]}']
+
+    def get_cache_tags(self, context):
+        return post_cache_tags(self.object) + [
+            f'author:{comment.author.username}'
+            for comment in context['comments'] if comment.author_id
+        ]
+
     def get_object(self, queryset=None):
         post = super().get_object(queryset)
         if post.author != self.request.user and (
@@ -107,29 +262,66 @@ class PostDetailView(DetailView):
         return post
 
 
-class CategoryView(ListView):
+class PostCommentsView(PostDetailView):
+    """Fragment with the next page of comments for "load more"."""
+
+    template_name = 'includes/includes/comment_list.html'
+
+
+def comment_stream_unavailable(request, post_id):
+    """Tell ``EventSource`` to stop reconnecting when served over WSGI.
+
+    Under ASGI the stream is answered by ``blog.streams`` before Django.
+    """
+    return HttpResponse(status=204)
+
+
+class CategoryView(PageCacheMixin, FeedPaginationMixin, ListView):
     """View to display posts of a specific category."""
 
     template_name = 'blog/category.html'
     # context_object_name = 'category_list'
-    paginate_by = settings.PAGIN_SIZE
 
     def get_category_object(self):
-        return get_object_or_404(
-            Category,
-            slug=self.kwargs.get('category_slug'),
-            is_published=True)
+        if not hasattr(self, 'category'):
+            self.category = get_object_or_404(
+                Category,
+                slug=self.kwargs.get('category_slug'),
+                is_published=True)
+        return self.category
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['category'] = self.get_category_object()
         return context
 
+    def get_base_cache_tags(self):
+        return [f'category:{self.kwargs["category_slug"]}']
+
+    def get_feed_filters(self):
+        return {'category': self.get_category_object()}
+
+
+class SearchView(ListView):
+    """View to search posts by title, text and comments."""
+
+    template_name = 'blog/search.html'
+    paginate_by = settings.PAGIN_SIZE
+
+    def get_query(self):
+        return self.request.GET.get('q', '').strip()
+
     def get_queryset(self):
-        category = self.get_category_object()
-        return get_posts_queryset(filter_param=True,
-                                  annotate_param=True
-                                  ).filter(category=category)
+        query = self.get_query()
+        if not query:
+            return []
+        return search_posts(
+            query, get_posts_queryset(filter_param=True, listing=True))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.get_query()
+        return context
 
 
 class CreatePostView(LoginRequiredMixin, CreateView):
@@ -155,13 +347,17 @@ class PostViewMixin(UserPassesTestMixin):
     template_name = 'blog/create.html'
     pk_url_kwarg = 'post_id'
 
+    def get_object(self, queryset=None):
+        # Пост нужен и проверке прав, и самому представлению.
+        if getattr(self, 'object', None) is None:
+            self.object = super().get_object(queryset)
+        return self.object
+
     def test_func(self):
-        object = self.get_object()
-        return object.author == self.request.user
+        return self.get_object().author_id == self.request.user.pk
 
     def handle_no_permission(self):
-        post = self.get_object()
-        return redirect('blog:post_detail', post_id=post.id)
+        return redirect('blog:post_detail', post_id=self.get_object().id)
 
 
 class EditPostView(LoginRequiredMixin, PostViewMixin, UpdateView):
@@ -183,9 +379,7 @@ class DeletePostView(LoginRequiredMixin, PostViewMixin, DeleteView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        post = self.get_object()
-
-        context['form'] = PostForm(instance=post)
+        context['form'] = PostForm(instance=self.object)
         return context
 
 
@@ -197,16 +391,19 @@ class CreateCommentView(LoginRequiredMixin, CreateView):
     form_class = CommentForm
 
     def dispatch(self, request, *args, **kwargs):
-        post = get_object_or_404(Post, id=self.kwargs['post_id'])
-        if not post.is_published and post.author != request.user:
+        self.post_object = get_object_or_404(Post, id=self.kwargs['post_id'])
+        if (not self.post_object.is_published
+                and self.post_object.author != request.user):
             raise Http404("Only the author can comment on unpublished posts.")
         return super().dispatch(request, *args, **kwargs)
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        form.instance.post = get_object_or_404(Post, id=self.kwargs[
-            'post_id'])
-        return super().form_valid(form)
+        form.instance.post = self.post_object
+        response = super().form_valid(form)
+        comment = self.object
+        transaction.on_commit(lambda: publish_comment(comment))
+        return response
 
     def get_success_url(self):
         return reverse('blog:post_detail',
@@ -225,14 +422,17 @@ class CommentViewMixin(UserPassesTestMixin):
     template_name = 'blog/comment.html'
     pk_url_kwarg = 'comment_id'
 
+    def get_object(self, queryset=None):
+        if getattr(self, 'object', None) is None:
+            self.object = super().get_object(queryset)
+        return self.object
+
     def test_func(self):
-        comment = self.get_object()
-        return comment.author == self.request.user
+        return self.get_object().author_id == self.request.user.pk
 
     def handle_no_permission(self):
-        comment = self.get_object()
         return redirect('blog:post_detail',
-                        post_id=comment.post.id)
+                        post_id=self.get_object().post_id)
 
     def get_success_url(self):
         return reverse_lazy('blog:post_detail',
@@ -0,0 +1,80 @@
+"""Time boundary of the public feed.
+
+Scheduled posts become visible without any write to the database, so
+feed caches key on the feed epoch, which changes only when the next
+scheduled post comes due. The state lives in ``PAGE_STATE_CACHE`` next
+to the tag versions, so a reset in one process reaches all of them.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Min
+from django.utils import timezone
+
+FEED_STATE_KEY = 'blog:feed-state'
+
+
+def _cache():
+    return caches[settings.PAGE_STATE_CACHE]
+
+
+def _floor(moment):
+    step = max(int(settings.FEED_TIME_GRANULARITY), 1)
+    seconds = int(moment.timestamp()) // step * step
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+def visibility_now():
+    """Return the current moment rounded down to the feed granularity."""
+    return _floor(timezone.now())
+
+
+def get_feed_state():
+    """Return ``(epoch, next_due)`` for the currently visible feed.
+
+    ``epoch`` is the boundary at which the visible set last changed
+    because of time passing, ``next_due`` is the earliest scheduled
+    publication after it (or ``None``).
+    """
+    from .models import Post
+
+    boundary = visibility_now()
+    state = _cache().get(FEED_STATE_KEY)
+    if state is None or (state[1] is not None and state[1] <= boundary):
+        # Состояние общее для процессов: не берём его из отставшей реплики.
+        next_due = Post.objects.using(DEFAULT_DB_ALIAS).filter(
+            is_published=True, pub_date__gt=boundary
+        ).aggregate(next_due=Min('pub_date'))['next_due']
+        state = (boundary, next_due)
+        _cache().set(FEED_STATE_KEY, state, None)
+    return state
+
+
+def get_feed_epoch():
+    """Return an integer that changes whenever a scheduled post comes due."""
+    return int(get_feed_state()[0].timestamp())
+
+
+def visible_from(pub_date):
+    """Return the first feed boundary at which ``pub_date`` is visible."""
+    # Пост попадает в ленту, когда граница перейдёт через его pub_date.
+    boundary = _floor(pub_date)
+    if boundary < pub_date:
+        boundary += timedelta(seconds=settings.FEED_TIME_GRANULARITY)
+    return boundary
+
+
+def feed_cache_timeout(default):
+    """Limit ``default`` so a cached feed expires when the next post is due."""
+    next_due = get_feed_state()[1]
+    if next_due is None:
+        return default
+    seconds = (visible_from(next_due) - timezone.now()).total_seconds()
+    return max(1, min(default, int(seconds) + 1))
+
+
+def reset_feed_state():
+    """Forget the cached schedule after posts were created or changed."""
+    _cache().delete(FEED_STATE_KEY)
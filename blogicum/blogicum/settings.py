@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -27,11 +29,17 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django_bootstrap5',
+    'core.apps.CoreConfig',
     'blog.apps.BlogConfig',
     'pages.apps.PagesConfig',
+    'jobs.apps.JobsConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,9 +78,72 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение живёт между запросами, а не открывается заново.
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# Реплика только для чтения: путь к её файлу SQLite (или имя базы) из
+# BLOGICUM_REPLICA_DB. Локально её заполняет manage.py sync_replica.
+# Чтения идут на реплики, кроме запросов с записью и следующих за ними
+# REPLICA_PIN_SECONDS секунд (cookie REPLICA_PIN_COOKIE).
+if os.getenv('BLOGICUM_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('BLOGICUM_REPLICA_DB'),
+        # В тестах реплика — та же база, что и основная.
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Страницы для общего кэша (blog.caching.serve_cached_page) рендерятся
+# по основной базе: иначе страница из отставшей реплики, прочитанная
+# сразу после сброса тегов, легла бы в кэш под новыми версиями тегов.
+REPLICA_PIN_SECONDS = 15
+REPLICA_PIN_COOKIE = 'primary_until'
+
+# PRAGMA, которые core выполняет на каждом новом соединении с SQLite.
+# WAL позволяет читать во время записи; synchronous=NORMAL в режиме WAL
+# не теряет целостность базы, только последние транзакции при сбое ОС.
+# busy_timeout — сколько миллисекунд ждать снятия блокировки записи,
+# cache_size со знаком минус задаётся в КиБ.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Страницы и версии их тегов должны быть общими для всех процессов
+    # (веб, runworker, publish_scheduled): иначе сброс тега в одном
+    # процессе не виден остальным. Файловый кэш работает без брокера; в
+    # продакшене его можно заменить на Redis или Memcached. core.cache
+    # считает файлы для вытеснения не чаще раза в CULL_INTERVAL секунд:
+    # запись страницы стоит одного файла, а не обхода каталога, зато
+    # между проверками каталог может вырасти сверх MAX_ENTRIES.
+    'pages': {
+        'BACKEND': 'core.cache.FileCache',
+        'LOCATION': BASE_DIR / 'cache' / 'pages',
+        'OPTIONS': {'MAX_ENTRIES': 2000, 'CULL_INTERVAL': 60},
+    },
+    # Версии тегов и состояние ленты (blog.visibility, blog.feed) отдельно
+    # от страниц и без вытеснения: случайно удалённая версия тега делала
+    # бы промахом все свежие страницы с ним. Записей не больше, чем
+    # постов, авторов, категорий и местоположений, а пишутся они только
+    # при изменениях.
+    'page-state': {
+        'BACKEND': 'core.cache.FileCache',
+        'LOCATION': BASE_DIR / 'cache' / 'state',
+        'OPTIONS': {'MAX_ENTRIES': 0},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -120,15 +191,131 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
 
-# Подключаем бэкенд filebased.EmailBackend:
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь фоновых задач, а обработчик очереди
+# (manage.py runworker) отправляет их через бэкенд filebased.EmailBackend:
+EMAIL_BACKEND = 'jobs.backends.QueuedEmailBackend'
+JOBS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # Указываем директорию, в которую будут сохраняться файлы писем:
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 MEDIA_ROOT = BASE_DIR / 'media'  # Путь к папке media
 
+# Ширины (в пикселях) уменьшенных копий изображений постов для srcset
+# и качество сжатия JPEG/WebP. Копии лежат рядом с оригиналом.
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_QUALITY = 82
+
 LOGIN_URL = 'login'
 
 LOGIN_REDIRECT_URL = 'blog:index'
 
 PAGIN_SIZE = 10
+
+# Проверка SQL каждого запроса: бюджеты числа запросов по имени URL,
+# повторы одинаковых запросов и N+1 (один SQL с QUERY_REPEAT_LIMIT и
+# более наборами параметров). Режимы: 'off', 'log' (предупреждение в
+# логгер core.queries) и 'raise' (исключение; так работают тесты).
+QUERY_BUDGET_MODE = 'log' if DEBUG else 'off'
+QUERY_REPEAT_LIMIT = 5
+# В лентах до двух запросов сверх страницы: раз в FEED_TIME_GRANULARITY
+# первый запрос ищет наступившие отложенные публикации и добавляет их в
+# ленту (blog.feed.publish_due), если не успел publish_scheduled.
+QUERY_BUDGETS = {
+    'blog:index': 7,
+    'blog:category_posts': 8,
+    'blog:profile': 8,
+    'blog:post_detail': 4,
+    'blog:post_comments': 4,
+    'blog:add_comment': 5,
+    'blog:edit_comment': 5,
+    'blog:delete_comment': 5,
+    'blog:create_post': 10,
+    'blog:edit_post': 11,
+    'blog:delete_post': 10,
+    'blog:edit_profile': 4,
+    'blog:search': 6,
+}
+
+# Разбивка времени запроса на SQL, шаблоны, кэш и код представления.
+# SERVER_TIMING добавляет её в заголовок Server-Timing; доля запросов
+# SERVER_TIMING_SAMPLE_RATE и все запросы дольше SERVER_TIMING_SLOW_MS
+# пишутся JSON-строками в логгер core.timing. Если всё выключено,
+# middleware не подключается.
+SERVER_TIMING = False
+SERVER_TIMING_SAMPLE_RATE = 0.0
+SERVER_TIMING_SLOW_MS = None
+
+# Метрики запросов в формате Prometheus (/metrics/): гистограммы
+# времени, размера ответа и числа SQL-запросов по имени URL. Каждый
+# процесс прямо во время обработки запроса сбрасывает свои значения в
+# файл METRICS_DIR/<pid>.json не чаще раза в METRICS_FLUSH_INTERVAL
+# секунд, поэтому каталог по умолчанию лежит вне исходников. Файлы
+# завершившихся процессов удаляются при запуске каждого процесса.
+METRICS_ENABLED = True
+METRICS_DIR = Path(os.getenv(
+    'BLOGICUM_METRICS_DIR',
+    Path(tempfile.gettempdir()) / 'blogicum-metrics'))
+METRICS_FLUSH_INTERVAL = 1
+# С токеном (BLOGICUM_METRICS_TOKEN) /metrics/ отдаётся по заголовку
+# «Authorization: Bearer <токен>» с любого адреса. Без токена — только
+# адресам METRICS_ALLOWED_IPS и без X-Forwarded-For: за обратным
+# прокси REMOTE_ADDR всегда 127.0.0.1, поэтому прокси должен передавать
+# X-Forwarded-For или сам закрывать /metrics/ снаружи.
+METRICS_TOKEN = os.getenv('BLOGICUM_METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
+# Асинхронные версии лент и страницы поста для работы под ASGI: ответы
+# из кэша и 304 отдаются без вызова самого представления. Файловый кэш
+# и база читаются в потоке синхронного кода, не в цикле событий.
+ASYNC_VIEWS = False
+
+# Комментарии на странице поста выводятся порциями по (created_at, id);
+# следующая порция подгружается кнопкой «Показать ещё».
+COMMENTS_PAGE_SIZE = 50
+
+# Поток новых комментариев (SSE, только под ASGI): период пустых
+# сообщений, не дающих закрыть соединение, и сколько событий ждёт
+# медленного читателя, прежде чем новые начнут отбрасываться.
+COMMENT_STREAM_HEARTBEAT = 15
+COMMENT_STREAM_QUEUE_SIZE = 100
+
+# Пагинация лент по курсору (pub_date, id) вместо номеров страниц:
+# без COUNT(*) и OFFSET, глубокие страницы не становятся медленнее.
+CURSOR_PAGINATION = False
+
+# Шаг (в секундах), до которого округляется «сейчас» в фильтре ленты.
+# Отложенные публикации появляются с задержкой не больше этого шага,
+# зато запросы и ключи кэша остаются одинаковыми в пределах шага.
+FEED_TIME_GRANULARITY = 60
+
+# Кэш отрендеренных карточек постов в лентах: алиас из CACHES и время
+# жизни в секундах. Ключ карточки меняется вместе с её содержимым,
+# поэтому кэш может быть своим у каждого процесса.
+POST_CARD_CACHE = 'default'
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+
+# Кэш целых страниц лент и постов для анонимных посетителей. Страницы
+# помечаются тегами (пост, категория, автор) и устаревают при их
+# изменении. Пока одна копия перерисовывает страницу (LOCK_TIMEOUT),
+# остальные отдают устаревшую версию или ждут до LOCK_WAIT секунд.
+# Кэш должен быть общим для процессов: с LocMemCache каждый процесс
+# видит только свои сбросы тегов, и manage.py check предупреждает
+# об этом (blog.W001). Версии тегов и состояние ленты лежат в
+# PAGE_STATE_CACHE, который тоже должен быть общим.
+PAGE_CACHE = 'pages'
+PAGE_STATE_CACHE = 'page-state'
+PAGE_CACHE_TIMEOUT = 60 * 10
+PAGE_CACHE_STALE_TIMEOUT = 60
+PAGE_CACHE_LOCK_TIMEOUT = 10
+PAGE_CACHE_LOCK_WAIT = 2
+
+# Очередь фоновых задач в базе данных (обработка изображений, письма).
+# Неудачная задача повторяется до JOBS_MAX_ATTEMPTS раз с паузой
+# JOBS_RETRY_DELAY * 2 ** (попытка - 1) секунд; задача, чей обработчик
+# молчит дольше JOBS_LOCK_TIMEOUT, отдаётся другому. С JOBS_EAGER задачи
+# выполняются сразу, без обработчика.
+JOBS_EAGER = False
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_DELAY = 30
+JOBS_LOCK_TIMEOUT = 60 * 10
+JOBS_POLL_INTERVAL = 1
@@ -5,10 +5,13 @@ from django.urls import path, include, reverse_lazy
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import metrics_view
+
 urlpatterns = [
     path('', include('blog.urls', namespace='blog')),
     path('pages/', include('pages.urls', namespace='pages')),
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
     path('auth/', include('django.contrib.auth.urls')),
     path(
         'auth/registration/',
@@ -0,0 +1,21 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+    verbose_name = 'Общие компоненты'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from django.conf import settings
+
+        from .db import apply_sqlite_pragmas
+        from .metrics import remove_stale_files
+        from .middleware import install_query_recorder
+
+        connection_created.connect(apply_sqlite_pragmas)
+        connection_created.connect(install_query_recorder)
+        if settings.METRICS_ENABLED:
+            remove_stale_files()
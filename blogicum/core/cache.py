@@ -0,0 +1,30 @@
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class FileCache(FileBasedCache):
+    """``FileBasedCache`` that does not list its directory on every write.
+
+    Django counts the cache files on each ``set()`` to decide whether to
+    cull, which takes milliseconds once thousands of entries exist. Here
+    every cache instance does that at most once per ``CULL_INTERVAL``
+    seconds, so the directory may grow past ``MAX_ENTRIES`` in between.
+    With ``MAX_ENTRIES`` 0 entries are never culled.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._cull_interval = params.get('OPTIONS', {}).get(
+            'CULL_INTERVAL', 60)
+        self._culled_at = None
+
+    def _cull(self):
+        if not self._max_entries:
+            return
+        now = time.monotonic()
+        if (self._culled_at is not None
+                and now - self._culled_at < self._cull_interval):
+            return
+        self._culled_at = now
+        super()._cull()
@@ -0,0 +1,15 @@
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Run ``PRAGMA`` statements of ``SQLITE_PRAGMAS`` on a new connection.
+
+    ``journal_mode`` is stored in the database file, the rest lives as
+    long as the connection, which ``CONN_MAX_AGE`` keeps open between
+    requests.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,36 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = ('Copy the default SQLite database into every replica from '
+            'DATABASE_REPLICAS. Stands in for replication locally.')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'No replicas configured; set BLOGICUM_REPLICA_DB.')
+        primary = connections['default']
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias].settings_dict
+            if not all('sqlite3' in db['ENGINE']
+                       for db in (primary.settings_dict, replica)):
+                raise CommandError(
+                    f'"{alias}" is not SQLite; use database replication.')
+            # Соединение реплики могло держать старую копию открытой.
+            connections[alias].close()
+            # Копируем через соединение Django: так работают и базы в
+            # памяти, например тестовая.
+            primary.ensure_connection()
+            target = sqlite3.connect(replica['NAME'])
+            try:
+                # backup() даёт согласованный снимок даже во время записи.
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(
+                f'Copied {primary.settings_dict["NAME"]} to '
+                f'{replica["NAME"]}.'))
@@ -0,0 +1,163 @@
+"""Request metrics shared between worker processes through files.
+
+Every process keeps its own counters in memory and writes them to
+``METRICS_DIR/<pid>.json`` at most every ``METRICS_FLUSH_INTERVAL``
+seconds. The exporter sums the files of all processes, so the numbers
+survive a pre-fork server spreading requests over several workers.
+Files left by processes that are gone are removed when a process starts.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+HISTOGRAMS = {
+    'blogicum_request_duration_seconds': (
+        'Request latency by URL name.',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)),
+    'blogicum_response_size_bytes': (
+        'Response body size by URL name.',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576)),
+    'blogicum_request_queries': (
+        'SQL queries per request by URL name.',
+        (0, 1, 2, 5, 10, 20, 50, 100)),
+}
+REQUESTS_TOTAL = 'blogicum_requests_total'
+
+
+class MetricsStore:
+    """Metrics of the current process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.requests = {}
+        self.histograms = {name: {} for name in HISTOGRAMS}
+        self._flushed_at = 0.0
+
+    def observe(self, view, status, values):
+        """Record one request; ``values`` maps histogram names to values."""
+        with self._lock:
+            if self.pid != os.getpid():
+                # Процесс-потомок после fork не наследует чужие значения.
+                self._reset()
+            key = f'{view}\n{status}'
+            self.requests[key] = self.requests.get(key, 0) + 1
+            for name, value in values.items():
+                buckets = HISTOGRAMS[name][1]
+                series = self.histograms[name].setdefault(
+                    view, {'buckets': [0] * (len(buckets) + 1),
+                           'sum': 0, 'count': 0})
+                index = next(
+                    (i for i, bound in enumerate(buckets) if value <= bound),
+                    len(buckets))
+                series['buckets'][index] += 1
+                series['sum'] += value
+                series['count'] += 1
+        self.flush()
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and (
+                now - self._flushed_at < settings.METRICS_FLUSH_INTERVAL):
+            return
+        with self._lock:
+            self._flushed_at = now
+            data = json.dumps(
+                {'requests': self.requests, 'histograms': self.histograms})
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{self.pid}.json'
+        temporary = directory / f'.{self.pid}.json.tmp'
+        temporary.write_text(data)
+        os.replace(temporary, path)
+
+
+store = MetricsStore()
+
+
+def remove_stale_files():
+    """Delete the files of processes that no longer run.
+
+    Called at startup by every process, so it must keep the files of
+    live sibling workers rather than empty the directory.
+    """
+    directory = Path(settings.METRICS_DIR)
+    if not directory.is_dir():
+        return
+    for path in directory.glob('*.json'):
+        if path.stem.isdigit() and not _is_running(int(path.stem)):
+            path.unlink(missing_ok=True)
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю.
+        pass
+    return True
+
+
+def collect():
+    """Sum the metrics written by all processes."""
+    store.flush(force=True)
+    requests = {}
+    histograms = {name: {} for name in HISTOGRAMS}
+    for path in Path(settings.METRICS_DIR).glob('*.json'):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        for key, value in data['requests'].items():
+            requests[key] = requests.get(key, 0) + value
+        for name, by_view in data['histograms'].items():
+            for view, series in by_view.items():
+                total = histograms[name].setdefault(
+                    view, {'buckets': [0] * len(series['buckets']),
+                           'sum': 0, 'count': 0})
+                total['buckets'] = [
+                    a + b for a, b in zip(total['buckets'], series['buckets'])
+                ]
+                total['sum'] += series['sum']
+                total['count'] += series['count']
+    return requests, histograms
+
+
+def _label(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def render(requests, histograms):
+    """Format metrics in the Prometheus text exposition format."""
+    lines = [
+        f'# HELP {REQUESTS_TOTAL} Requests by URL name and status.',
+        f'# TYPE {REQUESTS_TOTAL} counter',
+    ]
+    for key, value in sorted(requests.items()):
+        view, status = key.split('\n')
+        lines.append(
+            f'{REQUESTS_TOTAL}{{view="{_label(view)}",'
+            f'status="{status}"}} {value}')
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for view, series in sorted(histograms[name].items()):
+            label = f'view="{_label(view)}"'
+            cumulative = 0
+            bounds = [str(bound) for bound in buckets] + ['+Inf']
+            for bound, count in zip(bounds, series['buckets']):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label}}} {series["sum"]}')
+            lines.append(f'{name}_count{{{label}}} {series["count"]}')
+    return '\n'.join(lines) + '\n'
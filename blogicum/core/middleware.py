@@ -0,0 +1,357 @@
+import asyncio
+import contextvars
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.dispatch import Signal
+
+from . import metrics, routers, timing
+
+logger = logging.getLogger('core.queries')
+timing_logger = logging.getLogger('core.timing')
+
+# Служебные команды транзакций не считаются запросами страницы.
+_TRANSACTION_SQL = re.compile(
+    r'^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT|BEGIN|COMMIT)',
+    re.IGNORECASE)
+
+
+# Отправляется после каждого проверенного запроса: request, view_name,
+# queries. На него подписан плагин тестов, собирающий статистику.
+queries_recorded = Signal()
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more queries than its budget or an N+1 pattern."""
+
+
+class AsyncCapableMiddleware:
+    """Base of middleware that run in the mode of the handler they wrap.
+
+    Django adapts sync-only middleware under ASGI, sending every request
+    through ``sync_to_async`` into a thread. Subclasses implement
+    ``handle()`` for WSGI and ``__acall__()`` for ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так Django узнаёт асинхронный экземпляр, как у MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that remembers every query of a request."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not _TRANSACTION_SQL.match(sql):
+                self.queries.append({
+                    'sql': sql,
+                    'params': repr(params),
+                    'alias': context['connection'].alias,
+                    'time': time.perf_counter() - started,
+                })
+
+
+# Recorder текущего запроса. ContextVar, в отличие от execute_wrapper на
+# соединениях потока, доходит и до потока sync_to_async под ASGI.
+_current_recorder = contextvars.ContextVar('query_recorder', default=None)
+
+
+def record_current_queries(execute, sql, params, many, context):
+    """``execute_wrapper`` of every connection, see ``recorded_queries()``."""
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Add ``record_current_queries`` to a new connection, once."""
+    if record_current_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_current_queries)
+
+
+@contextmanager
+def recorded_queries():
+    """Yield a ``QueryRecorder`` of the queries run inside the block.
+
+    An enclosing block shares its recorder, so nested middleware record
+    every query once.
+    """
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        yield recorder
+        return
+    recorder = QueryRecorder()
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+
+
+def find_problems(queries, budget):
+    """Describe budget overruns, duplicated queries and N+1 patterns."""
+    problems = []
+    if budget is not None and len(queries) > budget:
+        problems.append(
+            f'{len(queries)} queries, the budget is {budget}')
+    duplicates = Counter(
+        (query['sql'], query['params']) for query in queries)
+    for (sql, _), count in duplicates.items():
+        if count > 1:
+            problems.append(f'identical query run {count} times: {sql}')
+    # Один и тот же SQL с разными параметрами — признак N+1.
+    params_by_sql = {}
+    for query in queries:
+        params_by_sql.setdefault(query['sql'], set()).add(query['params'])
+    for sql, params in params_by_sql.items():
+        if len(params) >= settings.QUERY_REPEAT_LIMIT:
+            problems.append(
+                f'query repeated with {len(params)} parameter sets '
+                f'(N+1?): {sql}')
+    return problems
+
+
+class QueryBudgetMiddleware(AsyncCapableMiddleware):
+    """Check the SQL of each request against ``QUERY_BUDGETS``.
+
+    Budgets are keyed by URL name (``blog:index``). With
+    ``QUERY_BUDGET_MODE = 'log'`` problems are logged, with ``'raise'``
+    the request fails with ``QueryBudgetExceeded``. The queries come from
+    the recorder shared with ``MetricsMiddleware``.
+    """
+
+    def handle(self, request):
+        if settings.QUERY_BUDGET_MODE == 'off':
+            return self.get_response(request)
+        with recorded_queries() as recorder:
+            start = len(recorder.queries)
+            response = self.get_response(request)
+        return self.check(request, response, recorder.queries[start:])
+
+    async def __acall__(self, request):
+        if settings.QUERY_BUDGET_MODE == 'off':
+            return await self.get_response(request)
+        with recorded_queries() as recorder:
+            start = len(recorder.queries)
+            response = await self.get_response(request)
+        return self.check(request, response, recorder.queries[start:])
+
+    def check(self, request, response, queries):
+        request.queries = queries
+        match = request.resolver_match
+        if match is None:
+            return response
+        queries_recorded.send(
+            sender=self.__class__, request=request,
+            view_name=match.view_name, queries=queries)
+        problems = find_problems(
+            queries, settings.QUERY_BUDGETS.get(match.view_name))
+        if problems:
+            message = (f'{request.method} {request.path} '
+                       f'({match.view_name}): ' + '; '.join(problems))
+            if settings.QUERY_BUDGET_MODE == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class ServerTimingMiddleware:
+    """Break the time of each request down by SQL, templates and cache.
+
+    With ``SERVER_TIMING`` the breakdown is sent in the ``Server-Timing``
+    header. A ``SERVER_TIMING_SAMPLE_RATE`` share of requests, and every
+    request slower than ``SERVER_TIMING_SLOW_MS``, is also logged to
+    ``core.timing`` as a JSON line.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.SERVER_TIMING
+                or settings.SERVER_TIMING_SAMPLE_RATE
+                or settings.SERVER_TIMING_SLOW_MS is not None):
+            raise MiddlewareNotUsed
+        timing.install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with timing.TimingCollector() as collector:
+            response = self.get_response(request)
+        breakdown = _breakdown(collector, time.perf_counter() - started)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = _server_timing(breakdown)
+        slow = settings.SERVER_TIMING_SLOW_MS
+        if (random.random() < settings.SERVER_TIMING_SAMPLE_RATE
+                or slow is not None and breakdown['total_ms'] >= slow):
+            match = request.resolver_match
+            timing_logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': match.view_name if match else None,
+                'status': response.status_code,
+                **breakdown,
+            }))
+        return response
+
+
+_NON_TOKEN = re.compile(r'[^\w.-]')
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def _breakdown(collector, total):
+    view_time = max(
+        total - collector.template_time - collector.outside_templates, 0)
+    return {
+        'total_ms': _ms(total),
+        'db': {'count': collector.db_count, 'ms': _ms(collector.db_time)},
+        'templates': {
+            name: {'count': count, 'ms': _ms(elapsed)}
+            for name, (count, elapsed) in sorted(
+                collector.templates.items(), key=lambda item: -item[1][1])
+        },
+        'cache': {'hits': collector.cache_hits,
+                  'misses': collector.cache_misses,
+                  'ms': _ms(collector.cache_time)},
+        'view_ms': _ms(view_time),
+    }
+
+
+def _server_timing(breakdown):
+    db = breakdown['db']
+    cache = breakdown['cache']
+    metrics = [
+        f'db;dur={db["ms"]};desc="{db["count"]} queries"',
+        f'cache;dur={cache["ms"]};'
+        f'desc="{cache["hits"]} hits {cache["misses"]} misses"',
+    ]
+    for name, entry in breakdown['templates'].items():
+        token = _NON_TOKEN.sub('_', name)
+        metrics.append(
+            f'tpl_{token};dur={entry["ms"]};'
+            f'desc="{name} x{entry["count"]}"')
+    metrics += [
+        f'view;dur={breakdown["view_ms"]}',
+        f'total;dur={breakdown["total_ms"]}',
+    ]
+    return ', '.join(metrics)
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """Feed ``core.metrics`` with latency, size and query count per view."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        started = time.perf_counter()
+        with recorded_queries() as recorder:
+            response = self.get_response(request)
+        self.observe(request, response, recorder, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with recorded_queries() as recorder:
+            response = await self.get_response(request)
+        self.observe(request, response, recorder, started)
+        return response
+
+    def observe(self, request, response, recorder, started):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        values = {
+            'blogicum_request_duration_seconds': duration,
+            'blogicum_request_queries': len(recorder.queries),
+        }
+        if not response.streaming:
+            values['blogicum_response_size_bytes'] = len(response.content)
+        metrics.store.observe(
+            match.view_name if match else '<unresolved>',
+            response.status_code, values)
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaPinMiddleware(AsyncCapableMiddleware):
+    """Send reads to ``default`` around a user's own writes.
+
+    Unsafe methods read from ``default``, and so does the rest of any
+    request after its first write. A request that wrote sets the
+    ``REPLICA_PIN_COOKIE`` cookie, which pins the following
+    ``REPLICA_PIN_SECONDS`` of the browser's requests as well.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        state, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.request_state.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        state, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.request_state.reset(token)
+        return self.pin(state, response)
+
+    def start(self, request):
+        state = {
+            'pinned': (request.method not in SAFE_METHODS
+                       or _pinned_until(request) > time.time()),
+            'wrote': False,
+        }
+        return state, routers.request_state.set(state)
+
+    def pin(self, state, response):
+        if state['wrote']:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, str(int(time.time() + seconds)),
+                max_age=seconds, httponly=True, samesite='Lax')
+        return response
+
+
+def _pinned_until(request):
+    try:
+        return int(request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0))
+    except ValueError:
+        return 0
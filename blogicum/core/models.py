@@ -10,6 +10,30 @@ class BaseModel(models.Model):
     created_at = models.DateTimeField(
         verbose_name='Добавлено',
         auto_now_add=True)
+    updated_at = models.DateTimeField(
+        verbose_name='Изменено',
+        auto_now=True,
+        db_index=True)
 
     class Meta:
         abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения полей на момент загрузки: по ним сигналы узнают,
+        # что именно изменилось при сохранении.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def get_loaded_value(self, attname):
+        """Return the value the field had when loaded from the database."""
+        return getattr(self, '_loaded_values', {}).get(attname)
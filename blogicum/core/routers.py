@@ -0,0 +1,68 @@
+"""Reads of web requests from replicas, everything else from ``default``.
+
+A request that writes, and every request of the same browser for
+``REPLICA_PIN_SECONDS`` after it, reads from ``default`` too, so users
+never see a replica that has not caught up with their own changes.
+``ReplicaPinMiddleware`` keeps that state in ``request_state``. Code
+outside requests (commands, the job worker, migrations) always reads
+from ``default``: it usually reads what it has just written. So does
+code inside ``primary_reads()``, such as rendering a page for the
+shared cache, whose result outlives the replica's lag.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+# Состояние текущего запроса: {'pinned': bool, 'wrote': bool}. Словарь
+# общий для потоков sync_to_async, поэтому запись видна middleware.
+request_state = contextvars.ContextVar('replica_state', default=None)
+
+
+@contextmanager
+def primary_reads():
+    """Read from ``default`` inside the block without pinning the browser.
+
+    Unlike a write, this sets no ``REPLICA_PIN_COOKIE``.
+    """
+    state = request_state.get()
+    if state is None or state['pinned']:
+        yield
+        return
+    state['pinned'] = True
+    try:
+        yield
+    finally:
+        # Запись внутри блока закрепляет основную базу до конца запроса.
+        state['pinned'] = state['wrote']
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = request_state.get()
+        if not settings.DATABASE_REPLICAS or state is None or state['pinned']:
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = request_state.get()
+        if state is not None:
+            # После записи до конца запроса читаем только основную базу.
+            state['pinned'] = state['wrote'] = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными основной базы.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
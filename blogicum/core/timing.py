@@ -0,0 +1,129 @@
+import contextvars
+import functools
+import os
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+_current = contextvars.ContextVar('timing_collector', default=None)
+
+
+class TimingCollector:
+    """Time spent in SQL, templates and the cache during one request.
+
+    ``outside_templates`` keeps the SQL and cache time that is not
+    already part of some template's rendering time.
+    """
+
+    def __init__(self):
+        self.db_count = 0
+        self.db_time = 0.0
+        self.templates = defaultdict(lambda: [0, 0.0])
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.outside_templates = 0.0
+        self._depth = 0
+        self._in_cache = False
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(
+                connections[alias].execute_wrapper(self._execute))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        _current.reset(self._token)
+
+    def _execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.db_count += 1
+            self.db_time += elapsed
+            if self._depth == 0:
+                self.outside_templates += elapsed
+
+    def add_template(self, name, elapsed, top_level):
+        entry = self.templates[name]
+        entry[0] += 1
+        entry[1] += elapsed
+        if top_level:
+            self.template_time += elapsed
+
+
+def _timed_render(render):
+    @functools.wraps(render)
+    def wrapper(self, context):
+        collector = _current.get()
+        if collector is None:
+            return render(self, context)
+        collector._depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            collector._depth -= 1
+            # Время вложенных шаблонов входит во время включающего.
+            collector.add_template(
+                os.path.basename(self.origin.template_name or 'inline'),
+                time.perf_counter() - started, collector._depth == 0)
+    wrapper.timed = True
+    return wrapper
+
+
+def _timed_cache_call(method, count_hits):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        collector = _current.get()
+        # get_many() бэкенда может вызывать get(): считаем только внешний.
+        if collector is None or collector._in_cache:
+            return method(self, *args, **kwargs)
+        collector._in_cache = True
+        started = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            collector._in_cache = False
+            elapsed = time.perf_counter() - started
+            collector.cache_time += elapsed
+            if collector._depth == 0:
+                collector.outside_templates += elapsed
+        hits, misses = count_hits(args, kwargs, result)
+        collector.cache_hits += hits
+        collector.cache_misses += misses
+        return result
+    wrapper.timed = True
+    return wrapper
+
+
+def _get_hits(args, kwargs, result):
+    default = args[1] if len(args) > 1 else kwargs.get('default')
+    return (0, 1) if result is default else (1, 0)
+
+
+def _get_many_hits(args, kwargs, result):
+    return len(result), len(args[0]) - len(result)
+
+
+def install():
+    """Wrap template rendering and cache reads with timers, once."""
+    if not getattr(Template._render, 'timed', False):
+        Template._render = _timed_render(Template._render)
+    for alias in caches:
+        backend = type(caches[alias])
+        for name, count_hits in (('get', _get_hits),
+                                 ('get_many', _get_many_hits)):
+            method = getattr(backend, name)
+            if not getattr(method, 'timed', False):
+                setattr(backend, name, _timed_cache_call(method, count_hits))
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from . import metrics
+
+
+def _metrics_allowed(request):
+    """Check the ``METRICS_TOKEN`` or, without one, the client address."""
+    if settings.METRICS_TOKEN:
+        scheme, _, token = request.META.get(
+            'HTTP_AUTHORIZATION', '').partition(' ')
+        return scheme.lower() == 'bearer' and constant_time_compare(
+            token, settings.METRICS_TOKEN)
+    # Запрос, пришедший через прокси, не считается локальным.
+    return (
+        request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+        and 'HTTP_X_FORWARDED_FOR' not in request.META
+    )
+
+
+def metrics_view(request):
+    """Prometheus exporter of the request metrics of all workers."""
+    if not _metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        metrics.render(*metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
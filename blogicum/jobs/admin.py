@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
+    # Аргументы не редактируются: по ним обработчик вызывает задачу.
+    readonly_fields = ('args', 'kwargs', 'locked_by', 'locked_at',
+                       'last_error', 'finished_at')
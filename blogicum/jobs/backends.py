@@ -0,0 +1,77 @@
+import base64
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .queue import task
+
+
+def _serialize(message):
+    """Return ``message`` as JSON-compatible data for the job arguments.
+
+    Only plain fields are stored, so a job row edited by hand can never
+    make the worker run code.
+    """
+    attachments = []
+    for attachment in message.attachments:
+        if isinstance(attachment, MIMEBase):
+            raise ValueError('MIME attachments cannot be queued.')
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode()
+        attachments.append(
+            [filename, base64.b64encode(content).decode(), mimetype])
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': dict(message.extra_headers),
+        'content_subtype': message.content_subtype,
+        'alternatives': [
+            list(alternative)
+            for alternative in getattr(message, 'alternatives', ())
+        ],
+        'attachments': attachments,
+    }
+
+
+def _deserialize(data):
+    """Rebuild the message saved by ``_serialize()``."""
+    data = dict(data)
+    content_subtype = data.pop('content_subtype')
+    attachments = data.pop('attachments')
+    data['alternatives'] = [tuple(item) for item in data['alternatives']]
+    message = EmailMultiAlternatives(**data)
+    message.content_subtype = content_subtype
+    for filename, content, mimetype in attachments:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+@task(max_attempts=5)
+def send_email(message):
+    """Deliver a queued message through ``JOBS_EMAIL_BACKEND``."""
+    with get_connection(settings.JOBS_EMAIL_BACKEND) as connection:
+        connection.send_messages([_deserialize(message)])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """E-mail backend that leaves the delivery to a queue worker."""
+
+    def send_messages(self, email_messages):
+        sent = 0
+        for message in email_messages:
+            try:
+                send_email.enqueue(_serialize(message))
+            except Exception:
+                if not self.fail_silently:
+                    raise
+                continue
+            sent += 1
+        return sent
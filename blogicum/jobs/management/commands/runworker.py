@@ -0,0 +1,75 @@
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connections
+
+from jobs.queue import claim_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of jobs run in parallel threads.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit as soon as no job is due instead of polling.')
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        # Сигнал остановки даёт начатым задачам завершиться.
+        handlers = {
+            signum: signal.signal(signum, lambda *args: self.stop.set())
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        try:
+            self.run(options['concurrency'], options['once'])
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def run(self, concurrency, once):
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        if concurrency <= 1:
+            self.work(name, once)
+            return
+        threads = [
+            threading.Thread(
+                target=self.work, args=(f'{name}:{number}', once))
+            for number in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def work(self, worker, once):
+        try:
+            while not self.stop.is_set():
+                try:
+                    job = claim_job(worker)
+                except OperationalError as error:
+                    # SQLite отвечает «database is locked» под нагрузкой.
+                    self.stderr.write(f'{worker}: {error}')
+                    self.stop.wait(settings.JOBS_POLL_INTERVAL)
+                    continue
+                if job is None:
+                    if once:
+                        return
+                    close_old_connections()
+                    self.stop.wait(settings.JOBS_POLL_INTERVAL)
+                    continue
+                if run_job(job):
+                    self.stdout.write(f'{worker}: {job} done')
+                else:
+                    self.stderr.write(
+                        f'{worker}: {job} failed ({job.status})')
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connections.close_all()
@@ -0,0 +1,45 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        FAILED = 'failed', 'Завершилась ошибкой'
+
+    name = models.CharField(verbose_name='Задача', max_length=255)
+    args = models.JSONField(verbose_name='Аргументы', default=list)
+    kwargs = models.JSONField(
+        verbose_name='Именованные аргументы', default=dict)
+    status = models.CharField(
+        verbose_name='Статус', max_length=16,
+        choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток')
+    run_at = models.DateTimeField(
+        verbose_name='Запустить не раньше', default=timezone.now)
+    locked_by = models.CharField(
+        verbose_name='Обработчик', max_length=64, blank=True)
+    locked_at = models.DateTimeField(
+        verbose_name='Взята в работу', null=True, blank=True)
+    last_error = models.TextField(verbose_name='Последняя ошибка', blank=True)
+    created_at = models.DateTimeField(
+        verbose_name='Добавлено', auto_now_add=True)
+    finished_at = models.DateTimeField(
+        verbose_name='Завершена', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'задача'
+        verbose_name_plural = 'Задачи'
+        ordering = ('run_at', 'id')
+        indexes = [
+            models.Index(fields=('status', 'run_at'),
+                         name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
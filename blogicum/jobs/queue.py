@@ -0,0 +1,141 @@
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+def task(func=None, *, max_attempts=None, concurrency=None):
+    """Register a function that can be put on the job queue.
+
+    ``concurrency`` limits how many jobs of the task may run at once
+    across all workers. Arguments of queued calls must be JSON-serializable.
+    """
+    def decorate(func):
+        func.job_name = f'{func.__module__}.{func.__qualname__}'
+        func.job_max_attempts = max_attempts
+        func.job_concurrency = concurrency
+        func.enqueue = lambda *args, **kwargs: enqueue(func, *args, **kwargs)
+        return func
+
+    if func is not None:
+        return decorate(func)
+    return decorate
+
+
+def get_task(name):
+    """Return the registered task called ``name``."""
+    func = import_string(name)
+    if getattr(func, 'job_name', None) != name:
+        raise ImportError(f'{name} is not a registered task.')
+    return func
+
+
+def enqueue(func, *args, **kwargs):
+    """Queue a call of ``func``, or run it right away with ``JOBS_EAGER``.
+
+    The job row is written in the current transaction, so workers only see
+    it once the data it refers to is committed.
+    """
+    if settings.JOBS_EAGER:
+        func(*args, **kwargs)
+        return None
+    return Job.objects.create(
+        name=func.job_name, args=list(args), kwargs=kwargs,
+        max_attempts=func.job_max_attempts or settings.JOBS_MAX_ATTEMPTS)
+
+
+def _busy_tasks(stale_before):
+    running = Job.objects.filter(
+        status=Job.Status.RUNNING, locked_at__gte=stale_before
+    ).order_by().values('name').annotate(total=Count('pk'))
+    busy = set()
+    for row in running:
+        try:
+            limit = get_task(row['name']).job_concurrency
+        except ImportError:
+            continue
+        if limit is not None and row['total'] >= limit:
+            busy.add(row['name'])
+    return busy
+
+
+def _running(stale_before):
+    """Count the running jobs of the same task, for the claiming UPDATE."""
+    running = Job.objects.filter(
+        name=OuterRef('name'), status=Job.Status.RUNNING,
+        locked_at__gte=stale_before,
+    ).order_by().values('name').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(running), 0, output_field=IntegerField())
+
+
+def claim_job(worker):
+    """Take the next due job for ``worker`` or return ``None``.
+
+    Jobs are taken with a conditional UPDATE, so two workers never get the
+    same one. The concurrency limit of the task is checked by the same
+    UPDATE, so two workers cannot both see a free slot. A job whose worker
+    died is taken again after ``JOBS_LOCK_TIMEOUT`` seconds.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    stale = Q(status=Job.Status.RUNNING, locked_at__lt=stale_before)
+    Job.objects.filter(stale, attempts__gte=F('max_attempts')).update(
+        status=Job.Status.FAILED, finished_at=now,
+        last_error='Обработчик остановился, не завершив задачу.')
+
+    candidates = Job.objects.filter(
+        Q(status=Job.Status.QUEUED, run_at__lte=now) | stale
+    ).exclude(name__in=_busy_tasks(stale_before))
+    for job in candidates.only('pk', 'name', 'status', 'locked_at')[:20]:
+        claimed = Job.objects.filter(
+            pk=job.pk, status=job.status, locked_at=job.locked_at)
+        try:
+            limit = get_task(job.name).job_concurrency
+        except ImportError:
+            limit = None
+        if limit is not None:
+            claimed = claimed.annotate(running=_running(stale_before)).filter(
+                running__lt=limit)
+        claimed = claimed.update(
+            status=Job.Status.RUNNING, locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1)
+        if claimed:
+            return Job.objects.get(pk=job.pk)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome, scheduling a retry on error.
+
+    Retries back off exponentially from ``JOBS_RETRY_DELAY`` seconds.
+    Returns ``True`` if the job succeeded.
+    """
+    try:
+        func = get_task(job.name)
+        func(*job.args, **job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.Status.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1))
+        else:
+            job.status = Job.Status.FAILED
+            job.finished_at = timezone.now()
+        succeeded = False
+    else:
+        job.status = Job.Status.DONE
+        job.finished_at = timezone.now()
+        succeeded = True
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=(
+        'status', 'run_at', 'last_error', 'finished_at',
+        'locked_by', 'locked_at'))
+    return succeeded
@@ -41,6 +41,21 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def metrics_dir(tmp_path):
+    with override_settings(METRICS_DIR=tmp_path / "metrics"):
+        yield tmp_path / "metrics"
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    from django.core.cache import caches
+
+    yield
+    for cache in caches.all():
+        cache.clear()
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
@@ -93,6 +108,7 @@ pytest_plugins = [
     "fixtures.categories",
     "fixtures.comments",
     "adapters.comment",
+    "plugins.query_budget",
 ]
 
 
@@ -363,6 +379,7 @@ def cleanup(request):
                     filename.endswith(".jpg")
                     or filename.endswith(".gif")
                     or filename.endswith(".png")
+                    or filename.endswith(".webp")
             ):
                 file_path = os.path.join(root, filename)
                 if os.path.getmtime(file_path) >= start_time:
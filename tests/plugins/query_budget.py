@@ -0,0 +1,42 @@
+"""Run every test request under ``QueryBudgetMiddleware`` in raise mode.
+
+A page going over its ``QUERY_BUDGETS`` entry, repeating a query or
+showing an N+1 pattern fails the test that requested it. Tests checking
+something else can opt out with ``@pytest.mark.no_query_budget``. The
+summary lists the largest number of queries seen per URL name, which
+is what the budgets in settings are tuned against.
+"""
+import pytest
+from django.test import override_settings
+
+from core.middleware import queries_recorded
+
+_max_queries = {}
+
+
+def _remember(sender, view_name, queries, **kwargs):
+    _max_queries[view_name] = max(
+        _max_queries.get(view_name, 0), len(queries))
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'no_query_budget: do not enforce query budgets in this test')
+    queries_recorded.connect(_remember, dispatch_uid='query_budget_plugin')
+
+
+@pytest.fixture(autouse=True)
+def query_budget(request):
+    mode = 'log' if request.node.get_closest_marker(
+        'no_query_budget') else 'raise'
+    with override_settings(QUERY_BUDGET_MODE=mode):
+        yield
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _max_queries:
+        return
+    terminalreporter.section('queries per request (max)')
+    for view_name, count in sorted(_max_queries.items()):
+        terminalreporter.write_line(f'{view_name}: {count}')
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.test import AsyncRequestFactory
+
+from blog.views import IndexView, PostDetailView, as_async_view
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _get(view, path, **kwargs):
+    request = AsyncRequestFactory().get(path)
+    request.user = AnonymousUser()
+    return async_to_sync(view)(request, **kwargs)
+
+
+def test_async_view_serves_cache_hit_without_queries(
+        client, django_assert_num_queries, post_with_published_location):
+    view = as_async_view(IndexView)
+    assert asyncio.iscoroutinefunction(view)
+    rendered = _get(view, '/')
+    rendered.render()
+    assert post_with_published_location.title in rendered.content.decode()
+
+    with django_assert_num_queries(0):
+        cached = _get(view, '/')
+    assert cached.content == rendered.content, (
+        "Убедитесь, что асинхронная лента отдаёт страницу из кэша без"
+        " запросов к базе."
+    )
+
+
+def test_async_view_keeps_visibility_rules(post_with_published_location):
+    post = post_with_published_location
+    post.is_published = False
+    post.save()
+    view = as_async_view(PostDetailView)
+    with pytest.raises(Http404):
+        _get(view, f'/posts/{post.id}/', post_id=post.id)
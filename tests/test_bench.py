@@ -0,0 +1,37 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from blog.management.commands.bench import summarize
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_bench_writes_report(tmp_path):
+    output = tmp_path / 'bench.json'
+    call_command(
+        'bench', '--use-current-database', '--users', '5', '--posts', '40',
+        '--comments', '60', '--categories', '3', '--requests', '60',
+        '--warmup', '5', '--output', str(output), stdout=StringIO())
+    report = json.loads(output.read_text())
+    assert report['total']['requests'] == 60
+    for key in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps',
+                'queries_per_request'):
+        assert key in report['total'], (
+            f"Убедитесь, что отчёт нагрузочного теста содержит `{key}`."
+        )
+    assert set(report['scenarios']) <= {
+        'feed', 'category', 'detail', 'profile', 'comment', 'login'}
+    assert not any(
+        status.endswith(' 500') or status.endswith(' 404')
+        for status in report['statuses'])
+
+
+def test_bench_rejects_empty_run():
+    assert summarize([], []) == {'requests': 0}, (
+        "Убедитесь, что сводка пустого замера не падает на делении на ноль."
+    )
+    with pytest.raises(CommandError):
+        call_command('bench', '--requests', '0', stdout=StringIO())
@@ -0,0 +1,34 @@
+import pytest
+
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _version(post_id):
+    return Post.objects.select_related('category', 'location').get(
+        pk=post_id).get_cache_version()
+
+
+def test_cache_version_follows_related_changes(
+        mixer, post_with_published_location):
+    post = post_with_published_location
+    versions = [_version(post.pk)]
+
+    comment = mixer.blend('blog.Comment', post=post)
+    versions.append(_version(post.pk))
+
+    comment.text = 'Исправленный текст'
+    comment.save()
+    versions.append(_version(post.pk))
+
+    post.category.save()
+    versions.append(_version(post.pk))
+
+    post.location.save()
+    versions.append(_version(post.pk))
+
+    assert versions == sorted(set(versions)), (
+        "Убедитесь, что версия поста меняется при изменении комментариев,"
+        " категории и местоположения."
+    )
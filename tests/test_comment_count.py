@@ -0,0 +1,98 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import Comment, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_comment_count_follows_comments(mixer, post_with_published_location):
+    post = post_with_published_location
+    comments = mixer.cycle(3).blend(Comment, post=post)
+    post.refresh_from_db()
+    assert post.comment_count == 3, (
+        "Убедитесь, что счётчик комментариев поста увеличивается при"
+        " добавлении комментария."
+    )
+
+    comments[0].delete()
+    Comment.objects.filter(pk=comments[1].pk).delete()
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что счётчик комментариев поста уменьшается при"
+        " удалении комментария."
+    )
+
+
+def test_post_delete_skips_counter_updates(
+        mixer, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(5).blend(Comment, post=post)
+    with CaptureQueriesContext(connection) as queries:
+        post.delete()
+    updates = [
+        query['sql'] for query in queries
+        if query['sql'].startswith('UPDATE "blog_post"')]
+    assert not updates, (
+        "Убедитесь, что при удалении поста счётчик комментариев не"
+        " обновляется для каждого удаляемого комментария."
+    )
+    assert not Comment.objects.exists()
+
+
+def test_failed_post_delete_keeps_counter_updates(
+        mixer, post_with_published_location):
+    post = post_with_published_location
+    comments = mixer.cycle(2).blend(Comment, post=post)
+
+    def fail(sender, **kwargs):
+        raise RuntimeError
+
+    post_delete.connect(fail, sender=Comment)
+    try:
+        with pytest.raises(RuntimeError), transaction.atomic():
+            post.delete()
+    finally:
+        post_delete.disconnect(fail, sender=Comment)
+    comments[0].delete()
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что после неудачного удаления поста счётчик его"
+        " комментариев снова обновляется."
+    )
+
+
+def test_comment_count_follows_moved_comment(
+        mixer, post_with_published_location, post_of_another_author):
+    comment = mixer.blend(Comment, post=post_with_published_location)
+    comment = Comment.objects.get(pk=comment.pk)
+    comment.post = post_of_another_author
+    comment.save()
+    counts = dict(Post.objects.values_list('pk', 'comment_count'))
+    assert counts[post_with_published_location.pk] == 0
+    assert counts[post_of_another_author.pk] == 1
+
+
+def test_rebuild_comment_counts(
+        mixer, post_with_published_location, post_of_another_author):
+    post = post_with_published_location
+    mixer.cycle(2).blend(Comment, post=post)
+    Post.objects.filter(pk=post.pk).update(comment_count=7)
+    stamps = dict(Post.objects.values_list('pk', 'updated_at'))
+    call_command('rebuild_comment_counts', stdout=StringIO())
+    post.refresh_from_db()
+    assert post.comment_count == 2, (
+        "Убедитесь, что команда `rebuild_comment_counts` пересчитывает"
+        " счётчики комментариев."
+    )
+    assert post.updated_at > stamps[post.pk], (
+        "Убедитесь, что исправленный счётчик меняет `updated_at`, иначе"
+        " закэшированная карточка покажет старое число."
+    )
+    other = Post.objects.get(pk=post_of_another_author.pk)
+    assert other.updated_at == stamps[other.pk]
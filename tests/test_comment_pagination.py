@@ -0,0 +1,57 @@
+import re
+from datetime import timedelta
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+
+from blog.models import Comment
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _more_url(content):
+    urls = re.findall(r'data-comments-more="([^"]+)"', content)
+    return urls[-1].replace('&amp;', '&') if urls else None
+
+
+@override_settings(COMMENTS_PAGE_SIZE=3)
+def test_comments_loaded_in_pages(
+        user_client, mixer, post_with_published_location):
+    post = post_with_published_location
+    comments = mixer.cycle(7).blend(Comment, post=post)
+    # Одинаковое время создания у части комментариев проверяет, что
+    # курсор различает их по id.
+    moment = timezone.now() - timedelta(hours=1)
+    Comment.objects.filter(pk__in=[c.pk for c in comments[:4]]).update(
+        created_at=moment)
+    expected = [
+        comment.pk for comment in Comment.objects.order_by('created_at', 'id')
+    ]
+
+    response = user_client.get(f'/posts/{post.id}/')
+    seen = [comment.pk for comment in response.context['comments']]
+    assert len(seen) == 3, (
+        "Убедитесь, что на странице поста выводится только первая порция"
+        " комментариев."
+    )
+    url = _more_url(response.content.decode('utf-8'))
+    assert url, (
+        "Убедитесь, что под комментариями есть кнопка загрузки следующих."
+    )
+    while url:
+        response = user_client.get(url)
+        content = response.content.decode('utf-8')
+        assert '<html' not in content, (
+            "Убедитесь, что следующие комментарии отдаются фрагментом"
+            " страницы."
+        )
+        seen += [comment.pk for comment in response.context['comments']]
+        url = _more_url(content)
+    assert seen == expected
+
+
+def test_comments_reject_bad_cursor(user_client, post_with_published_location):
+    response = user_client.get(
+        f'/posts/{post_with_published_location.id}/comments/?comments=bad')
+    assert response.status_code == 404
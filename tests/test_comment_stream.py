@@ -0,0 +1,75 @@
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.test import TestCase
+
+from blog import streams
+from blogicum.asgi import application
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _scope(path):
+    return {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+        'headers': [], 'http_version': '1.1', 'scheme': 'http',
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 1),
+        'root_path': '', 'asgi': {'version': '3.0'},
+    }
+
+
+def test_new_comment_pushed_to_stream(
+        user_client, post_with_published_location):
+    post = post_with_published_location
+
+    def add_comment():
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            user_client.post(
+                f'/posts/{post.id}/comment/', data={'text': 'Живой коммент'})
+
+    async def scenario():
+        stream = ApplicationCommunicator(
+            application, _scope(f'/posts/{post.id}/comments/stream/'))
+        await stream.send_input({'type': 'http.request'})
+        start = await stream.receive_output()
+        assert start['status'] == 200
+        assert (b'content-type', b'text/event-stream') in start['headers']
+
+        await sync_to_async(add_comment)()
+        message = await stream.receive_output()
+        await stream.send_input({'type': 'http.disconnect'})
+        await stream.wait()
+        return message['body'].decode('utf-8')
+
+    body = async_to_sync(scenario)()
+    assert 'event: comment' in body and 'Живой коммент' in body, (
+        "Убедитесь, что новый комментарий отправляется в поток SSE поста."
+    )
+
+
+def test_stream_of_hidden_post_not_found(post_with_published_location):
+    post = post_with_published_location
+    post.is_published = False
+    post.save()
+
+    async def scenario():
+        stream = ApplicationCommunicator(
+            application, _scope(f'/posts/{post.id}/comments/stream/'))
+        await stream.send_input({'type': 'http.request'})
+        return await stream.receive_output()
+
+    assert async_to_sync(scenario)()['status'] == 404
+
+
+def test_comment_without_readers_not_rendered(
+        monkeypatch, user_client, post_with_published_location):
+    rendered = []
+    monkeypatch.setattr(streams, 'render_comment', rendered.append)
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        user_client.post(
+            f'/posts/{post_with_published_location.id}/comment/',
+            data={'text': 'Без читателей'})
+    assert not rendered, (
+        "Убедитесь, что комментарий не рендерится для потока, если его"
+        " никто не читает."
+    )
@@ -0,0 +1,59 @@
+from http import HTTPStatus
+from unittest import mock
+
+import pytest
+
+from blog.caching import get_page_cache
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_detail_answers_304(
+        client, mixer, django_assert_num_queries,
+        post_with_published_location):
+    url = f'/posts/{post_with_published_location.id}/'
+    response = client.get(url)
+    etag = response['ETag']
+    assert etag and response.has_header('Last-Modified'), (
+        "Убедитесь, что страница поста отдаёт заголовки `ETag` и"
+        " `Last-Modified`."
+    )
+
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response['ETag'] == etag
+
+    mixer.blend('blog.Comment', post=post_with_published_location)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK, (
+        "Убедитесь, что после нового комментария страница поста отдаётся"
+        " целиком."
+    )
+    assert response['ETag'] != etag
+
+
+def test_listing_validators_depend_on_user(
+        user_client, another_user_client, post_with_published_location):
+    response = user_client.get('/')
+    etag = response['ETag']
+    assert user_client.get(
+        '/', HTTP_IF_NONE_MATCH=etag).status_code == HTTPStatus.NOT_MODIFIED
+    assert another_user_client.get(
+        '/', HTTP_IF_NONE_MATCH=etag).status_code == HTTPStatus.OK
+
+
+def test_validators_are_not_stored(user_client, post_with_published_location):
+    url = f'/posts/{post_with_published_location.id}/'
+    # Первый ответ ставит cookie CSRF, от которой зависит ETag.
+    user_client.get(url)
+    etag = user_client.get(url)['ETag']
+    cache = get_page_cache()
+    with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set, \
+            mock.patch.object(cache, 'add', wraps=cache.add) as cache_add:
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert not cache_set.called and not cache_add.called, (
+        "Убедитесь, что `ETag` строится из версий тегов и просмотр"
+        " страницы не записывает ничего в кэш страниц."
+    )
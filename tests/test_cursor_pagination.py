@@ -0,0 +1,46 @@
+import re
+
+import pytest
+from django.test import override_settings
+
+from conftest import N_PER_PAGE
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _next_cursor(content):
+    cursors = re.findall(r'\?cursor=([\w-]+)', content)
+    return cursors[-1] if cursors else None
+
+
+@override_settings(CURSOR_PAGINATION=True)
+def test_cursor_pagination_walks_feed(
+        user_client, many_posts_with_published_locations):
+    posts = many_posts_with_published_locations
+    expected = sorted(
+        posts, key=lambda post: (post.pub_date, post.id), reverse=True)
+
+    response = user_client.get('/')
+    seen = [post.id for post in response.context['page_obj']]
+    assert len(seen) == N_PER_PAGE
+    assert not response.context['page_obj'].has_previous()
+
+    cursor = _next_cursor(response.content.decode('utf-8'))
+    assert cursor, (
+        "Убедитесь, что при пагинации по курсору на первой странице есть"
+        " ссылка на следующую страницу."
+    )
+    response = user_client.get(f'/?cursor={cursor}')
+    page_obj = response.context['page_obj']
+    seen += [post.id for post in page_obj]
+    assert seen == [post.id for post in expected]
+    assert not page_obj.has_next()
+
+    response = user_client.get(f'/?cursor={page_obj.previous_cursor}')
+    assert [post.id for post in response.context['page_obj']] == seen[
+        :N_PER_PAGE]
+
+
+@override_settings(CURSOR_PAGINATION=True)
+def test_cursor_pagination_rejects_bad_cursor(user_client):
+    assert user_client.get('/?cursor=garbage').status_code == 404
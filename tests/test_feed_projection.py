@@ -0,0 +1,54 @@
+import pytest
+from django.db import connection
+from django.db.models import Model
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import Comment
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def deferred_loads(monkeypatch):
+    """Fields loaded one by one because a queryset had deferred them."""
+    loads = []
+    refresh_from_db = Model.refresh_from_db
+
+    def spy(self, using=None, fields=None):
+        if fields:
+            loads.append(f'{type(self).__name__}.{", ".join(fields)}')
+        return refresh_from_db(self, using=using, fields=fields)
+
+    monkeypatch.setattr(Model, 'refresh_from_db', spy)
+    return loads
+
+
+@pytest.mark.parametrize('url', [
+    '/',
+    '/category/{post.category.slug}/',
+    '/profile/{post.author.username}/',
+    '/search/?q={post.title}',
+])
+def test_feed_reads_only_projected_fields(
+        url, client, user_client, mixer, deferred_loads,
+        many_posts_with_published_locations, post_with_published_location):
+    post = post_with_published_location
+    mixer.blend(Comment, post=post)
+    url = url.format(post=post)
+    for page_client in (client, user_client):
+        with CaptureQueriesContext(connection) as queries:
+            response = page_client.get(url)
+        assert response.status_code == 200
+        assert not deferred_loads, (
+            "Убедитесь, что шаблоны лент обращаются только к полям,"
+            " загруженным `Post.objects.for_cards()`; иначе каждый пост"
+            f" добавляет запрос. Дозагружены: {', '.join(deferred_loads)}."
+        )
+    post_sql = [
+        query['sql'] for query in queries
+        if 'FROM "blog_post"' in query['sql']]
+    for column in ('"blog_post"."text"', '"auth_user"."password"',
+                   '"blog_category"."description"'):
+        assert not any(column in sql for sql in post_sql), (
+            f"Убедитесь, что ленты не загружают столбец {column}."
+        )
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from blog.feed import publish_due
+from blog.models import FeedEntry, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _feed_ids():
+    return set(FeedEntry.objects.values_list('post_id', flat=True))
+
+
+def test_entry_follows_post_and_category(post_with_published_location):
+    post = post_with_published_location
+    assert _feed_ids() == {post.id}, (
+        "Убедитесь, что опубликованный пост сразу попадает в FeedEntry."
+    )
+    post.is_published = False
+    post.save()
+    assert not _feed_ids(), (
+        "Убедитесь, что снятый с публикации пост удаляется из FeedEntry."
+    )
+    post.is_published = True
+    post.save()
+    category = post.category
+    category.is_published = False
+    category.save()
+    assert not _feed_ids(), (
+        "Убедитесь, что посты скрытой категории удаляются из FeedEntry."
+    )
+    category.is_published = True
+    category.save()
+    assert _feed_ids() == {post.id}
+    post.delete()
+    assert not FeedEntry.objects.exists()
+
+
+@override_settings(FEED_TIME_GRANULARITY=60)
+def test_scheduled_post_is_added_when_due(post_with_published_location):
+    post = post_with_published_location
+    now = timezone.now()
+    post.pub_date = now + timedelta(minutes=5)
+    post.save()
+    assert publish_due() == 0
+    assert not _feed_ids(), (
+        "Убедитесь, что отложенная публикация не попадает в FeedEntry"
+        " до даты публикации."
+    )
+    with mock.patch('django.utils.timezone.now',
+                    return_value=now + timedelta(minutes=7)):
+        assert publish_due() == 1
+        assert publish_due() == 0
+    assert FeedEntry.objects.get().pub_date == post.pub_date
+
+
+def test_feeds_read_feed_entries(
+        client, post_with_published_location, post_of_another_author):
+    publish_due()
+    # Как после bulk_create: строки поста нет, а ленты уже проверены.
+    FeedEntry.objects.filter(post=post_of_another_author).delete()
+    for url in ('/', f'/category/{post_of_another_author.category.slug}/',
+                f'/profile/{post_of_another_author.author.username}/'):
+        page_obj = client.get(url).context['page_obj']
+        assert post_of_another_author not in page_obj, (
+            "Убедитесь, что ленты читают посты из FeedEntry."
+        )
+        assert page_obj.paginator.count == len(page_obj)
+
+    call_command('rebuild_feed', stdout=StringIO())
+    assert _feed_ids() == set(Post.objects.values_list('pk', flat=True)), (
+        "Убедитесь, что `rebuild_feed` заново заполняет FeedEntry."
+    )
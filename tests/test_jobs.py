@@ -0,0 +1,113 @@
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.test import override_settings
+
+from jobs.models import Job
+from jobs.queue import claim_job, run_job, task
+
+pytestmark = [pytest.mark.django_db]
+
+CALLS = []
+
+
+@task(max_attempts=2)
+def flaky(value):
+    CALLS.append(value)
+    if len(CALLS) == 1:
+        raise RuntimeError('first attempt fails')
+
+
+@task(concurrency=1)
+def exclusive():
+    pass
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    CALLS.clear()
+
+
+@override_settings(JOBS_RETRY_DELAY=0)
+def test_failed_job_is_retried():
+    job = flaky.enqueue('payload')
+    call_command('runworker', '--once', stdout=StringIO(),
+                 stderr=StringIO())
+    job.refresh_from_db()
+    assert CALLS == ['payload', 'payload'], (
+        "Убедитесь, что упавшая задача выполняется повторно."
+    )
+    assert job.status == Job.Status.DONE and job.attempts == 2
+    assert 'first attempt fails' in job.last_error
+
+
+def test_job_fails_after_max_attempts():
+    job = flaky.enqueue('payload')
+    Job.objects.filter(pk=job.pk).update(attempts=1)
+    run_job(claim_job('test'))
+    job.refresh_from_db()
+    assert job.status == Job.Status.FAILED, (
+        "Убедитесь, что задача не повторяется больше `max_attempts` раз."
+    )
+
+
+def test_job_claimed_once_and_concurrency_limited():
+    first = exclusive.enqueue()
+    exclusive.enqueue()
+    assert claim_job('one') == first
+    assert claim_job('two') is None, (
+        "Убедитесь, что задачу нельзя взять дважды и что число"
+        " одновременно выполняемых задач ограничено."
+    )
+
+
+def test_concurrency_checked_when_claiming():
+    exclusive.enqueue()
+    exclusive.enqueue()
+    # Как если бы второй обработчик проверил занятость до первого захвата.
+    with mock.patch('jobs.queue._busy_tasks', return_value=set()):
+        assert claim_job('one') is not None
+        assert claim_job('two') is None, (
+            "Убедитесь, что ограничение `concurrency` проверяется тем же"
+            " запросом, которым задача берётся в работу."
+        )
+
+
+@override_settings(
+    EMAIL_BACKEND='jobs.backends.QueuedEmailBackend',
+    JOBS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+def test_mail_is_sent_by_worker():
+    mail.send_mail('Тема', 'Текст', 'from@example.com', ['to@example.com'])
+    assert not mail.outbox, (
+        "Убедитесь, что письма отправляются обработчиком очереди,"
+        " а не во время запроса."
+    )
+    call_command('runworker', '--once', stdout=StringIO())
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].subject == 'Тема'
+
+
+@override_settings(
+    EMAIL_BACKEND='jobs.backends.QueuedEmailBackend',
+    JOBS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+def test_queued_mail_is_plain_data():
+    message = mail.EmailMultiAlternatives(
+        'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+        cc=['cc@example.com'], headers={'X-Tag': 'blog'})
+    message.attach_alternative('<p>Текст</p>', 'text/html')
+    message.attach('note.txt', 'Вложение', 'text/plain')
+    message.send()
+    job = Job.objects.get()
+    assert job.args[0]['to'] == ['to@example.com'], (
+        "Убедитесь, что письмо ставится в очередь в виде простых данных,"
+        " а не сериализованного объекта."
+    )
+    run_job(claim_job('test'))
+    sent = mail.outbox[0]
+    assert sent.cc == ['cc@example.com']
+    assert sent.extra_headers == {'X-Tag': 'blog'}
+    assert sent.alternatives == [('<p>Текст</p>', 'text/html')]
+    assert sent.attachments == [('note.txt', 'Вложение', 'text/plain')]
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import re
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, override_settings
+from django.urls import resolve
+
+from blog.models import Post
+from core import metrics
+from core.middleware import MetricsMiddleware
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.store._reset()
+
+
+def _value(text, series):
+    match = re.search(re.escape(series) + r' (\S+)', text)
+    return float(match.group(1)) if match else None
+
+
+def test_metrics_labelled_by_url_name(client, post_with_published_location):
+    client.get('/')
+    client.get(f'/posts/{post_with_published_location.id}/')
+    text = client.get('/metrics/').content.decode('utf-8')
+    assert _value(
+        text, 'blogicum_request_duration_seconds_count{view="blog:index"}'
+    ) == 1, (
+        "Убедитесь, что время запросов собирается по имени URL."
+    )
+    assert _value(
+        text, 'blogicum_requests_total{view="blog:post_detail",status="200"}'
+    ) == 1
+    assert _value(
+        text, 'blogicum_request_queries_bucket{view="blog:index",le="+Inf"}'
+    ) == 1
+    assert 'blogicum_response_size_bytes_sum{view="blog:index"}' in text
+
+
+def test_metrics_summed_across_processes(client, metrics_dir):
+    client.get('/')
+    other = {
+        'requests': {'blog:index\n200': 4},
+        'histograms': {'blogicum_request_queries': {'blog:index': {
+            'buckets': [0, 0, 0, 4, 0, 0, 0, 0, 0], 'sum': 20, 'count': 4,
+        }}},
+    }
+    metrics_dir.mkdir(exist_ok=True)
+    (metrics_dir / '999999.json').write_text(json.dumps(other))
+    text = client.get('/metrics/').content.decode('utf-8')
+    assert _value(
+        text, 'blogicum_requests_total{view="blog:index",status="200"}'
+    ) == 5, (
+        "Убедитесь, что метрики всех процессов-обработчиков суммируются."
+    )
+    assert _value(
+        text, 'blogicum_request_queries_count{view="blog:index"}') == 5
+
+
+
+def test_stale_metrics_removed_at_startup(metrics_dir):
+    metrics_dir.mkdir(exist_ok=True)
+    running = metrics_dir / f'{os.getpid()}.json'
+    gone = metrics_dir / '4194305.json'
+    running.write_text('{}')
+    gone.write_text('{}')
+    metrics.remove_stale_files()
+    assert running.exists() and not gone.exists(), (
+        "Убедитесь, что при запуске удаляются только файлы метрик"
+        " завершившихся процессов."
+    )
+
+def test_metrics_hidden_from_outside(client):
+    response = client.get('/metrics/', REMOTE_ADDR='203.0.113.1')
+    assert response.status_code == 404
+
+
+def test_metrics_hidden_behind_proxy(client):
+    response = client.get('/metrics/', HTTP_X_FORWARDED_FOR='203.0.113.1')
+    assert response.status_code == 404, (
+        "Убедитесь, что без токена метрики не отдаются запросам,"
+        " пришедшим через обратный прокси."
+    )
+
+
+@override_settings(METRICS_TOKEN='secret')
+def test_metrics_require_token(client):
+    assert client.get('/metrics/').status_code == 404, (
+        "Убедитесь, что при заданном METRICS_TOKEN метрики без токена"
+        " не отдаются даже локальным адресам."
+    )
+    assert client.get(
+        '/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code == 404
+    response = client.get(
+        '/metrics/', REMOTE_ADDR='203.0.113.1',
+        HTTP_X_FORWARDED_FOR='203.0.113.1',
+        HTTP_AUTHORIZATION='Bearer secret')
+    assert response.status_code == 200
+
+
+def test_metrics_middleware_runs_async(post_with_published_location):
+    async def view(request):
+        await sync_to_async(Post.objects.count)()
+        return HttpResponse()
+
+    middleware = MetricsMiddleware(view)
+    assert asyncio.iscoroutinefunction(middleware), (
+        "Убедитесь, что под ASGI middleware метрик работает асинхронно,"
+        " без перехода в поток."
+    )
+    request = AsyncRequestFactory().get('/')
+    request.resolver_match = resolve('/')
+    async_to_sync(middleware)(request)
+    text = metrics.render(*metrics.collect())
+    assert _value(
+        text, 'blogicum_request_queries_sum{view="blog:index"}') == 1, (
+        "Убедитесь, что запросы асинхронного представления к базе"
+        " считаются."
+    )
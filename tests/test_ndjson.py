@@ -0,0 +1,93 @@
+import json
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+
+from blog.models import Category, Comment, Location, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _snapshot():
+    return {
+        'users': sorted(get_user_model().objects.values_list(
+            'username', 'password', 'date_joined')),
+        'categories': sorted(Category.objects.values_list(
+            'slug', 'title', 'is_published', 'created_at')),
+        'locations': sorted(Location.objects.values_list('name', flat=True)),
+        'posts': sorted(Post.objects.values_list(
+            'id', 'title', 'pub_date', 'author__username', 'category__slug',
+            'location__name', 'created_at', 'comment_count')),
+        'comments': sorted(Comment.objects.values_list(
+            'id', 'post_id', 'author__username', 'text', 'created_at')),
+    }
+
+
+def test_ndjson_round_trip(
+        tmp_path, mixer, post_with_published_location, post_of_another_author):
+    mixer.cycle(3).blend(Comment, post=post_with_published_location)
+    mixer.blend(Comment, post=post_of_another_author)
+    before = _snapshot()
+    dump = tmp_path / 'blog.ndjson'
+    call_command('export_ndjson', str(dump), stderr=StringIO())
+
+    lines = [json.loads(line) for line in dump.read_text().splitlines()]
+    assert [line['model'] for line in lines].count('blog.comment') == 4
+    post_line = next(line for line in lines if line['model'] == 'blog.post')
+    assert isinstance(post_line['fields']['author'], str), (
+        "Убедитесь, что внешние ключи выгружаются как естественные ключи."
+    )
+
+    for model in (Comment, Post, Location, Category, get_user_model()):
+        model.objects.all().delete()
+    call_command('import_ndjson', str(dump), '--batch-size', '2',
+                 stdout=StringIO(), stderr=StringIO())
+    assert _snapshot() == before, (
+        "Убедитесь, что `import_ndjson` восстанавливает выгруженные данные,"
+        " включая даты создания и счётчики комментариев."
+    )
+
+    call_command('import_ndjson', str(dump),
+                 stdout=StringIO(), stderr=StringIO())
+    assert _snapshot() == before, (
+        "Убедитесь, что повторный импорт не создаёт дубликатов."
+    )
+
+
+def test_ndjson_import_with_taken_ids(
+        tmp_path, mixer, another_user, post_with_published_location):
+    post = post_with_published_location
+    comments = mixer.cycle(2).blend(Comment, post=post)
+    dump = tmp_path / 'blog.ndjson'
+    call_command('export_ndjson', str(dump), stderr=StringIO())
+    post_id, title = post.id, post.title
+    Post.objects.all().delete()
+    # Другой пост занял id выгруженного, его комментарий — id комментария.
+    other = mixer.blend(Post, id=post_id, author=another_user,
+                        category=post.category, title='Другой пост')
+    mixer.blend(Comment, id=comments[0].id, post=other, author=another_user)
+
+    with pytest.raises(CommandError):
+        call_command('import_ndjson', str(dump),
+                     stdout=StringIO(), stderr=StringIO())
+    assert Post.objects.count() == 1 and Comment.objects.count() == 1, (
+        "Убедитесь, что `import_ndjson` без `--remap-ids` не импортирует"
+        " посты, чьи id заняты другими постами."
+    )
+
+    for _ in range(2):
+        call_command('import_ndjson', str(dump), '--remap-ids',
+                     stdout=StringIO(), stderr=StringIO())
+    imported = Post.objects.get(title=title)
+    assert imported.id != post_id, (
+        "Убедитесь, что с `--remap-ids` пост с занятым id получает новый."
+    )
+    assert Post.objects.count() == 2
+    assert sorted(imported.comments.values_list('text', flat=True)) == sorted(
+        comment.text for comment in comments), (
+        "Убедитесь, что комментарии переехавшего поста остаются с ним,"
+        " а повторный импорт не создаёт дубликатов."
+    )
+    assert Post.objects.get(id=post_id).comments.count() == 1
@@ -0,0 +1,102 @@
+import pytest
+from django.test import RequestFactory, override_settings
+
+from blog import caching
+from blog.caching import get_page_cache
+from blog.checks import check_page_cache
+from core.cache import FileCache
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_anonymous_pages_are_cached(
+        client, django_assert_num_queries, post_with_published_location):
+    post = post_with_published_location
+    urls = (
+        '/',
+        f'/posts/{post.id}/',
+        f'/category/{post.category.slug}/',
+        f'/profile/{post.author.username}/',
+    )
+    for url in urls:
+        first = client.get(url)
+        assert first.status_code == 200
+        with django_assert_num_queries(0):
+            second = client.get(url)
+        assert second.content == first.content, (
+            f"Убедитесь, что страница `{url}` отдаётся анонимам из кэша."
+        )
+
+
+def test_page_cache_invalidated_by_tags(
+        client, mixer, post_with_published_location):
+    post = post_with_published_location
+    client.get('/')
+    client.get(f'/posts/{post.id}/')
+
+    post.title = 'Заголовок после правки'
+    post.save()
+    assert 'Заголовок после правки' in client.get('/').content.decode()
+
+    mixer.blend('blog.Comment', post=post, text='Свежий комментарий')
+    assert 'Свежий комментарий' in client.get(
+        f'/posts/{post.id}/').content.decode()
+
+    post.category.title = 'Новое название'
+    post.category.save()
+    assert 'Новое название' in client.get(
+        f'/posts/{post.id}/').content.decode()
+
+
+def test_authenticated_pages_are_not_cached(
+        user_client, post_with_published_location):
+    user_client.get('/')
+    response = user_client.get('/')
+    assert response.context is not None, (
+        "Убедитесь, что страницы для авторизованных пользователей не"
+        " берутся из кэша."
+    )
+
+
+def test_stale_page_served_while_locked(
+        client, django_assert_num_queries, post_with_published_location):
+    post = post_with_published_location
+    url = f'/posts/{post.id}/'
+    client.get(url)
+    post.title = 'Обновлённый заголовок'
+    post.save()
+
+    # Другая копия уже перерисовывает страницу.
+    page_key = caching._page_key(RequestFactory().get(url), listing=False)
+    assert get_page_cache().add(f'{page_key}:lock', 1, 10)
+    with django_assert_num_queries(0):
+        stale = client.get(url).content.decode()
+    assert 'Обновлённый заголовок' not in stale
+
+
+def test_page_cache_is_shared_between_processes():
+    assert not check_page_cache(None)
+    for name in ('PAGE_CACHE', 'PAGE_STATE_CACHE'):
+        with override_settings(**{name: 'default'}):
+            assert [warning.id for warning in check_page_cache(None)] == [
+                'blog.W001'], (
+                "Убедитесь, что при кэше страниц или версий тегов в памяти"
+                " процесса проверка `manage.py check` предупреждает об этом."
+            )
+
+
+def test_file_cache_culls_rarely(tmp_path):
+    cache = FileCache(tmp_path, {
+        'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_FREQUENCY': 1}})
+    for number in range(5):
+        cache.set(f'page:{number}', number)
+    assert len(list(tmp_path.iterdir())) == 5, (
+        "Убедитесь, что кэш страниц считает файлы для вытеснения не при"
+        " каждой записи."
+    )
+    state = FileCache(tmp_path / 'state', {'OPTIONS': {'MAX_ENTRIES': 0}})
+    for number in range(5):
+        state.set(f'tag:{number}', number, None)
+    assert state.get('tag:0') == 0, (
+        "Убедитесь, что версии тегов не вытесняются."
+    )
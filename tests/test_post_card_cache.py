@@ -0,0 +1,45 @@
+from unittest import mock
+
+import pytest
+
+from blog.caching import get_card_cache, post_card_key
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_post_card_is_cached(user_client, post_with_published_location):
+    user_client.get('/')
+    post = Post.objects.select_related('author', 'category', 'location').get(
+        pk=post_with_published_location.pk)
+    assert get_card_cache().get(post_card_key(post)), (
+        "Убедитесь, что карточка поста сохраняется в кэше фрагментов."
+    )
+    with mock.patch('blog.caching.render_to_string') as render:
+        content = user_client.get('/').content.decode('utf-8')
+    render.assert_not_called()
+    assert post.title in content
+
+
+def test_post_card_evicted_on_related_changes(
+        user_client, post_with_published_location):
+    post = post_with_published_location
+    user_client.get('/')
+
+    post.category.title = 'Переименованная категория'
+    post.category.save()
+    content = user_client.get('/').content.decode('utf-8')
+    assert 'Переименованная категория' in content, (
+        "Убедитесь, что карточки постов сбрасываются при изменении"
+        " категории."
+    )
+
+    post.location.name = 'Новое место'
+    post.location.save()
+    content = user_client.get('/').content.decode('utf-8')
+    assert 'Новое место' in content
+
+    post.author.username = 'renamed_author'
+    post.author.save()
+    content = user_client.get('/').content.decode('utf-8')
+    assert '@renamed_author' in content
@@ -0,0 +1,31 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_excerpt_follows_text(post_with_published_location):
+    post = post_with_published_location
+    post.text = ' '.join(f'слово{i}' for i in range(25))
+    post.save()
+    post.refresh_from_db()
+    assert post.word_count == 25
+    assert post.excerpt == ' '.join(
+        f'слово{i}' for i in range(10)) + ' …', (
+        "Убедитесь, что начало текста поста пересчитывается при сохранении."
+    )
+
+
+def test_feed_does_not_load_text(client, post_with_published_location):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get('/')
+    post_queries = [
+        query['sql'] for query in queries
+        if 'FROM "blog_post"' in query['sql']]
+    assert post_queries and not any(
+        '"blog_post"."text"' in sql for sql in post_queries), (
+        "Убедитесь, что ленты не загружают полный текст постов."
+    )
+    assert post_with_published_location.excerpt in response.content.decode(
+        'utf-8')
@@ -0,0 +1,79 @@
+from io import BytesIO, StringIO
+
+import pytest
+from PIL import Image
+from django.core.files.images import ImageFile
+from django.core.management import call_command
+from django.test import override_settings
+
+from blog.images import WEBP, variant_name
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _image_file(width, height):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color=(73, 109, 137)).save(
+        buffer, format='JPEG')
+    return ImageFile(buffer, name='variant_test.jpg')
+
+
+@pytest.fixture
+def media_root(tmp_path):
+    with override_settings(MEDIA_ROOT=tmp_path,
+                           POST_IMAGE_WIDTHS=(320, 640, 960)):
+        yield tmp_path
+
+
+def test_variants_generated_on_upload(
+        mixer, user, published_category, media_root):
+    post = mixer.blend(
+        Post, author=user, category=published_category,
+        image=_image_file(800, 600))
+    assert post.image_widths == [], (
+        "Убедитесь, что копии изображения создаются в фоновой задаче,"
+        " а не во время запроса."
+    )
+    call_command('runworker', '--once', stdout=StringIO())
+    post.refresh_from_db()
+    assert post.image_widths == [320, 640, 800], (
+        "Убедитесь, что при загрузке изображения создаются уменьшенные"
+        " копии, не шире оригинала."
+    )
+    for width in (320, 640):
+        assert (media_root / variant_name(post.image.name, width)).exists()
+    for width in (320, 640, 800):
+        assert (media_root / variant_name(
+            post.image.name, width, WEBP)).exists()
+    with Image.open(media_root / variant_name(post.image.name, 320)) as img:
+        assert img.size == (320, 240)
+    assert f'{post.image.url} 800w' in post.image_srcset
+    assert '.webp 800w' in post.image_webp_srcset
+
+
+def test_srcset_rendered_in_feed(
+        user_client, mixer, user, published_category, media_root):
+    mixer.blend(
+        Post, author=user, category=published_category,
+        image=_image_file(700, 700))
+    call_command('runworker', '--once', stdout=StringIO())
+    content = user_client.get('/').content.decode('utf-8')
+    assert 'srcset=' in content and 'image/webp' in content, (
+        "Убедитесь, что в карточке поста выводятся `srcset` и WebP-копия"
+        " изображения."
+    )
+
+
+def test_backfill_command_is_idempotent(
+        mixer, user, published_category, media_root):
+    post = mixer.blend(
+        Post, author=user, category=published_category,
+        image=_image_file(400, 300))
+    Post.objects.update(image_widths=[])
+    call_command('process_post_images', stdout=StringIO())
+    files = sorted(path.name for path in media_root.rglob('*'))
+    call_command('process_post_images', '--all', stdout=StringIO())
+    assert sorted(path.name for path in media_root.rglob('*')) == files
+    post.refresh_from_db()
+    assert post.image_widths == [320, 400]
@@ -0,0 +1,63 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, override_settings
+from django.urls import resolve
+
+from blog.models import Post
+from core.middleware import (
+    MetricsMiddleware, QueryBudgetExceeded, QueryBudgetMiddleware,
+    QueryRecorder, find_problems
+)
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _query(sql, params):
+    return {'sql': sql, 'params': repr(params), 'alias': 'default',
+            'time': 0}
+
+
+@override_settings(QUERY_BUDGETS={'blog:index': 1})
+def test_budget_overrun_fails_request(client):
+    with pytest.raises(QueryBudgetExceeded) as error:
+        client.get('/')
+    assert 'blog:index' in str(error.value), (
+        "Убедитесь, что превышение бюджета запросов к странице приводит"
+        " к ошибке."
+    )
+
+
+@override_settings(QUERY_REPEAT_LIMIT=3)
+def test_repeated_and_n_plus_one_queries_found():
+    sql = 'SELECT * FROM auth_user WHERE id = %s'
+    assert find_problems([_query(sql, (1,)), _query(sql, (2,))], None) == []
+    duplicated = find_problems([_query(sql, (1,)), _query(sql, (1,))], None)
+    assert len(duplicated) == 1 and 'identical' in duplicated[0]
+    n_plus_one = find_problems(
+        [_query(sql, (pk,)) for pk in range(3)], None)
+    assert len(n_plus_one) == 1 and 'N+1' in n_plus_one[0]
+
+
+@override_settings(QUERY_BUDGETS={'blog:index': 1})
+def test_async_budget_shares_recorder(post_with_published_location):
+    async def view(request):
+        await sync_to_async(Post.objects.count)()
+        await sync_to_async(Post.objects.count)()
+        return HttpResponse()
+
+    middleware = MetricsMiddleware(QueryBudgetMiddleware(view))
+    assert asyncio.iscoroutinefunction(middleware)
+    request = AsyncRequestFactory().get('/')
+    request.resolver_match = resolve('/')
+    with mock.patch('core.middleware.QueryRecorder',
+                    wraps=QueryRecorder) as recorder_class:
+        with pytest.raises(QueryBudgetExceeded):
+            async_to_sync(middleware)(request)
+    assert recorder_class.call_count == 1, (
+        "Убедитесь, что middleware метрик и бюджета запросов записывают"
+        " запросы одним общим recorder."
+    )
@@ -0,0 +1,182 @@
+import asyncio
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from blog.models import Comment, FeedEntry, Post
+from core.middleware import ReplicaPinMiddleware
+
+pytestmark = [pytest.mark.django_db]
+
+REPLICAS = override_settings(DATABASE_REPLICAS=['replica'])
+
+
+def _serve(request, write=False):
+    """Run a request through the middleware; return (response, read db)."""
+    seen = {}
+
+    def view(request):
+        if write:
+            router.db_for_write(Comment)
+        seen['db'] = router.db_for_read(Post)
+        return HttpResponse()
+
+    response = ReplicaPinMiddleware(view)(request)
+    return response, seen['db']
+
+
+@REPLICAS
+def test_reads_go_to_replica():
+    response, db = _serve(RequestFactory().get('/'))
+    assert db == 'replica', (
+        "Убедитесь, что GET-запросы без записи читают из реплики."
+    )
+    assert 'primary_until' not in response.cookies
+
+
+@REPLICAS
+def test_write_pins_primary():
+    response, db = _serve(RequestFactory().post('/'), write=True)
+    assert db == 'default'
+    assert 'primary_until' in response.cookies, (
+        "Убедитесь, что после записи ставится cookie, закрепляющая"
+        " чтение за основной базой."
+    )
+
+    request = RequestFactory().get('/')
+    request.COOKIES['primary_until'] = response.cookies['primary_until'].value
+    assert _serve(request)[1] == 'default', (
+        "Убедитесь, что после записи следующие запросы читают из основной"
+        " базы."
+    )
+    request.COOKIES['primary_until'] = str(int(time.time()) - 1)
+    assert _serve(request)[1] == 'replica'
+
+
+@REPLICAS
+def test_write_inside_get_pins_rest_of_request():
+    response, db = _serve(RequestFactory().get('/'), write=True)
+    assert db == 'default'
+    assert 'primary_until' in response.cookies
+
+
+def test_comment_redirect_sets_pin(
+        user_client, post_with_published_location):
+    with REPLICAS:
+        response = user_client.post(
+            f'/posts/{post_with_published_location.id}/comment/',
+            {'text': 'Новый комментарий'})
+    assert response.status_code == 302
+    assert 'primary_until' in response.cookies, (
+        "Убедитесь, что после добавления комментария чтение закрепляется"
+        " за основной базой."
+    )
+
+
+@REPLICAS
+def test_reads_outside_requests_use_primary():
+    assert router.db_for_read(Post) == 'default', (
+        "Убедитесь, что команды и фоновые задачи читают из основной базы."
+    )
+
+
+@REPLICAS
+def test_replicas_are_not_migrated():
+    assert router.allow_migrate('replica', 'blog') is False
+    assert router.allow_migrate('default', 'blog') is True
+
+
+@pytest.fixture
+def replica_db(tmp_path):
+    """A real second SQLite file registered as the ``replica`` alias."""
+    connections.settings['replica'] = {
+        **connections.settings['default'],
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    try:
+        yield 'replica'
+    finally:
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_requests_read_real_replica(
+        client, user_client, post_with_published_location, replica_db):
+    post = post_with_published_location
+    post.title = 'Исходный заголовок'
+    post.save()
+    url = f'/posts/{post.id}/'
+    with REPLICAS:
+        call_command('sync_replica', stdout=StringIO())
+        # Реплика отстала: в ней ещё старый заголовок.
+        Post.objects.using(replica_db).filter(pk=post.pk).update(
+            title='Заголовок из реплики')
+        # Поиск не кэшируется: посты читаются из реплики.
+        found = client.get('/search/', {'q': 'Исходный'}).content.decode()
+        assert 'Заголовок из реплики' in found, (
+            "Убедитесь, что анонимные GET-запросы читают из реплики."
+        )
+        response = client.get(url)
+        assert post.title in response.content.decode(), (
+            "Убедитесь, что страница для общего кэша рендерится по основной"
+            " базе: иначе отставшая реплика попадёт в кэш."
+        )
+        assert 'primary_until' not in response.cookies
+        response = user_client.post(
+            f'/posts/{post.id}/comment/', {'text': 'Новый комментарий'})
+        assert 'primary_until' in response.cookies
+        content = user_client.get(url).content.decode()
+    assert post.title in content and 'Заголовок из реплики' not in content, (
+        "Убедитесь, что после добавления комментария запросы с cookie"
+        " `primary_until` читают из основной базы."
+    )
+
+
+@REPLICAS
+def test_pin_middleware_runs_async():
+    seen = {}
+
+    async def view(request):
+        seen['db'] = router.db_for_read(Post)
+        return HttpResponse()
+
+    middleware = ReplicaPinMiddleware(view)
+    assert asyncio.iscoroutinefunction(middleware), (
+        "Убедитесь, что под ASGI middleware реплик работает асинхронно."
+    )
+    async_to_sync(middleware)(RequestFactory().get('/'))
+    assert seen['db'] == 'replica'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_feed_publishes_due_posts_on_primary(
+        client, post_with_published_location, replica_db):
+    post = post_with_published_location
+    now = timezone.now()
+    with REPLICAS, override_settings(FEED_TIME_GRANULARITY=60):
+        call_command('sync_replica', stdout=StringIO())
+        # Реплика ещё не знает, что пост перенесён на будущее.
+        post.pub_date = now + timedelta(minutes=5)
+        post.save()
+        with mock.patch('django.utils.timezone.now',
+                        return_value=now + timedelta(minutes=7)):
+            response = client.get('/')
+    assert FeedEntry.objects.filter(post=post).exists(), (
+        "Убедитесь, что наступившие публикации ищутся в основной базе,"
+        " а не в отставшей реплике."
+    )
+    assert 'primary_until' not in response.cookies, (
+        "Убедитесь, что добавление наступивших публикаций в ленту не"
+        " закрепляет анонимного посетителя за основной базой."
+    )
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from blog.caching import get_tag_versions
+from blog.feed import post_published, publish_due
+from blog.visibility import get_feed_state
+
+pytestmark = [pytest.mark.django_db]
+
+
+@override_settings(FEED_TIME_GRANULARITY=60)
+def test_scheduler_publishes_due_posts(post_with_published_location):
+    post = post_with_published_location
+    now = timezone.now()
+    post.pub_date = now + timedelta(minutes=5)
+    post.save()
+    publish_due()
+    get_feed_state()
+    tags = ['feed', f'post:{post.id}', f'category:{post.category.slug}',
+            f'author:{post.author.username}']
+    versions = get_tag_versions(tags)
+    published = []
+
+    def receiver(sender, posts, **kwargs):
+        published.extend(post.id for post in posts)
+
+    post_published.connect(receiver)
+    try:
+        with mock.patch('django.utils.timezone.now',
+                        return_value=now + timedelta(minutes=7)):
+            call_command('publish_scheduled', '--once', stdout=StringIO())
+            epoch = get_feed_state()[0]
+    finally:
+        post_published.disconnect(receiver)
+    assert published == [post.id], (
+        "Убедитесь, что `publish_scheduled` отправляет сигнал"
+        " `post_published` для наступивших публикаций."
+    )
+    changed = get_tag_versions(tags)
+    assert all(changed[key] != versions[key] for key in versions), (
+        "Убедитесь, что при публикации в общем кэше страниц сбрасываются"
+        " теги ленты, поста, категории и профиля автора."
+    )
+    assert epoch >= post.pub_date, (
+        "Убедитесь, что после публикации эпоха ленты сдвигается за дату"
+        " опубликованного поста."
+    )
+
+
+@override_settings(PAGE_CACHE='default')
+def test_scheduler_requires_shared_cache():
+    with pytest.raises(CommandError):
+        call_command('publish_scheduled', '--once', stdout=StringIO())
+
+
+@override_settings(FEED_TIME_GRANULARITY=60)
+def test_scheduler_sleeps_until_next_due(post_with_published_location):
+    from blog.management.commands.publish_scheduled import Command
+
+    assert Command.seconds_to_next(3600) == 3600
+    post = post_with_published_location
+    post.pub_date = timezone.now() + timedelta(minutes=5)
+    post.save()
+    assert 4 * 60 < Command.seconds_to_next(3600) <= 6 * 60, (
+        "Убедитесь, что планировщик спит до даты ближайшей отложенной"
+        " публикации."
+    )
+    assert Command.seconds_to_next(30) == 30
@@ -0,0 +1,88 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from blog.models import Comment, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def searchable_posts(mixer, user, published_category):
+    past = timezone.now() - timedelta(days=1)
+    return {
+        'title': mixer.blend(
+            Post, title='Прогулка по горам', text='Обычный день.',
+            pub_date=past, is_published=True, author=user,
+            category=published_category),
+        'text': mixer.blend(
+            Post, title='Заметки', text='Долго шли к горам <b>пешком</b>.',
+            pub_date=past, is_published=True, author=user,
+            category=published_category),
+        'hidden': mixer.blend(
+            Post, title='Снятый пост про горы', text='Горы.',
+            pub_date=past, is_published=False, author=user,
+            category=published_category),
+        'future': mixer.blend(
+            Post, title='Будущий пост про горы', text='Горы.',
+            pub_date=timezone.now() + timedelta(days=1), is_published=True,
+            author=user, category=published_category),
+    }
+
+
+def _found(client, query):
+    response = client.get('/search/', {'q': query})
+    assert response.status_code == 200
+    return response, [post.pk for post in response.context['page_obj']]
+
+
+def test_search_ranks_visible_posts(client, searchable_posts):
+    response, found = _found(client, 'гора')
+    assert found == [
+        searchable_posts['title'].pk, searchable_posts['text'].pk], (
+        "Убедитесь, что поиск находит только видимые посты и ставит"
+        " совпадение в заголовке выше совпадения в тексте."
+    )
+    content = response.content.decode('utf-8')
+    assert '<mark>горам</mark>' in content, (
+        "Убедитесь, что совпадения выделяются в сниппете тегом `<mark>`."
+    )
+    assert '<b>пешком</b>' not in content, (
+        "Убедитесь, что HTML из текста поста экранируется в сниппете."
+    )
+
+
+def test_search_index_follows_changes(client, mixer, searchable_posts):
+    post = searchable_posts['text']
+    comment = mixer.blend(Comment, post=searchable_posts['title'],
+                          text='Возьмите термос')
+    assert _found(client, 'термос')[1] == [searchable_posts['title'].pk], (
+        "Убедитесь, что поиск учитывает текст комментариев."
+    )
+
+    comment.delete()
+    assert _found(client, 'термос')[1] == []
+    post.text = 'Долго шли к морю.'
+    post.save()
+    assert _found(client, 'гора')[1] == [searchable_posts['title'].pk], (
+        "Убедитесь, что индекс обновляется при изменении поста."
+    )
+
+
+def test_rebuild_search_index(client, searchable_posts):
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM blog_search')
+    assert _found(client, 'заметки')[1] == []
+    out = StringIO()
+    call_command('rebuild_search_index', stdout=out)
+    assert 'rebuilt' in out.getvalue()
+    assert _found(client, 'заметки')[1] == [searchable_posts['text'].pk]
+
+
+def test_empty_search(client):
+    response, found = _found(client, '  ')
+    assert found == []
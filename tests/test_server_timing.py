@@ -0,0 +1,42 @@
+import json
+import logging
+
+import pytest
+from django.test import override_settings
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _metrics(header):
+    return {
+        item.split(';')[0].strip(): item for item in header.split(',')
+    }
+
+
+@override_settings(SERVER_TIMING=True)
+def test_server_timing_header(client, post_with_published_location):
+    response = client.get('/')
+    metrics = _metrics(response['Server-Timing'])
+    for name in ('db', 'cache', 'view', 'total', 'tpl_index.html',
+                 'tpl_post_card.html'):
+        assert name in metrics, (
+            "Убедитесь, что заголовок `Server-Timing` разбивает время"
+            f" запроса по частям; нет метрики `{name}`."
+        )
+    assert 'misses' in metrics['cache']
+
+    metrics = _metrics(client.get('/')['Server-Timing'])
+    assert 'tpl_index.html' not in metrics, (
+        "Страница из кэша не должна рендерить шаблоны."
+    )
+    assert '"0 queries"' in metrics['db']
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1.0)
+def test_sampled_requests_logged(client, caplog):
+    with caplog.at_level(logging.INFO, logger='core.timing'):
+        response = client.get('/')
+    assert not response.has_header('Server-Timing')
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record['view'] == 'blog:index'
+    assert {'db', 'templates', 'cache', 'view_ms', 'total_ms'} <= set(record)
@@ -0,0 +1,36 @@
+import pytest
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import override_settings
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _pragma(db, name):
+    with db.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+def test_pragmas_applied_to_connection():
+    assert _pragma(connection, 'synchronous') == 1, (
+        "Убедитесь, что новые соединения с SQLite получают"
+        " `synchronous=NORMAL` из `SQLITE_PRAGMAS`."
+    )
+    assert _pragma(connection, 'temp_store') == 2
+    assert _pragma(connection, 'busy_timeout') == 20000
+
+
+@override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL',
+                                   'cache_size': -1000})
+def test_file_database_switches_to_wal(tmp_path):
+    db = DatabaseWrapper({
+        **connection.settings_dict, 'NAME': str(tmp_path / 'db.sqlite3'),
+    }, alias='pragmas')
+    try:
+        assert _pragma(db, 'journal_mode') == 'wal', (
+            "Убедитесь, что файловая база SQLite переводится в режим WAL."
+        )
+        assert _pragma(db, 'cache_size') == -1000
+    finally:
+        db.close()
@@ -0,0 +1,45 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+
+from blog.visibility import (
+    feed_cache_timeout, get_feed_epoch, visibility_now
+)
+
+pytestmark = [pytest.mark.django_db]
+
+
+@override_settings(FEED_TIME_GRANULARITY=60)
+def test_visibility_now_is_rounded():
+    boundary = visibility_now()
+    assert boundary <= timezone.now()
+    assert boundary.second == 0 and boundary.microsecond == 0
+
+
+@override_settings(FEED_TIME_GRANULARITY=60)
+def test_scheduled_post_appears_without_restart(
+        user_client, post_with_published_location):
+    post = post_with_published_location
+    now = timezone.now()
+    post.pub_date = now + timedelta(minutes=5)
+    post.save()
+
+    response = user_client.get('/')
+    assert post not in response.context['page_obj'], (
+        "Убедитесь, что отложенная публикация не видна в ленте до даты"
+        " публикации."
+    )
+    epoch = get_feed_epoch()
+    assert feed_cache_timeout(3600) <= 6 * 60
+
+    later = now + timedelta(minutes=7)
+    with mock.patch('django.utils.timezone.now', return_value=later):
+        assert get_feed_epoch() != epoch
+        response = user_client.get('/')
+    assert post in response.context['page_obj'], (
+        "Убедитесь, что отложенная публикация появляется в ленте, когда"
+        " наступает дата публикации, без перезапуска сервера."
+    )